@@ -0,0 +1,301 @@
+"""Benchmark suite for matching, repository operations and order
+generation. Results are printed as JSON lines, one line per measured
+operation, so runs of different versions and backends can be compared.
+
+Usage:
+    python -m benchmarks.run --depths 1000 10000 --output bench.jsonl
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from uuid import UUID
+
+from domain.models import Order, OrderBook
+from domain.vectorized import VectorizedOrderBook
+from main import get_random_orders
+from orderflow.generators import stream_random_orders
+from repository.mmap_repository import MmapOrderRepository
+from repository.repository import (PriceLevelOrderRepository,
+                                   SimpleOrderRepository)
+from repository.sqlite_repository import SQLiteOrderRepository
+from repository.tiered_repository import TieredOrderRepository
+
+
+def temporary_mmap_repository() -> MmapOrderRepository:
+    """Function creates memory-mapped repository in temporary file. The
+    file is unlinked once it is mapped, so it is removed together with
+    the repository."""
+    descriptor, path = tempfile.mkstemp(suffix='.book')
+    os.close(descriptor)
+    repository = MmapOrderRepository(path)
+    os.remove(path)
+    return repository
+
+
+BACKENDS = {
+    'simple': SimpleOrderRepository,
+    'price_level': PriceLevelOrderRepository,
+    'tiered': TieredOrderRepository,
+    'mmap': temporary_mmap_repository,
+    'sqlite': SQLiteOrderRepository,
+}
+
+ENGINES = {
+    'iterative': OrderBook,
+    'vectorized': VectorizedOrderBook,
+}
+
+MID_PRICE = 50
+
+SPREADS = {
+    'uniform': lambda generator: generator.uniform(0.01, 49.9),
+    'narrow': lambda generator: min(49.9, abs(generator.gauss(0, 1))),
+}
+
+
+def make_orders(
+    number: int,
+    buy_ratio: float,
+    spread: str,
+    generator: random.Random,
+    aggressive: bool = False,
+) -> list[Order]:
+    """Function generates list of orders with the specified share of
+    buy-orders. Prices are spread around the mid price by the specified
+    distribution: passive orders rest on their side of the mid price,
+    aggressive orders cross it."""
+    get_offset = SPREADS[spread]
+    orders = []
+    for _ in range(number):
+        order_type = 'buy' if generator.random() < buy_ratio else 'sell'
+        offset = max(0.01, get_offset(generator))
+        if (order_type == 'buy') != aggressive:
+            offset = -offset
+        orders.append(Order(
+            order_id=UUID(int=generator.getrandbits(128)),
+            timestamp=1,
+            order_type=order_type,
+            quantity=generator.randint(1, 500),
+            price=round(MID_PRICE + offset, 2),
+        ))
+    return orders
+
+
+def summarize(samples: list[float], operations: int = 0) -> dict:
+    """Function turns list of latencies in seconds into throughput and
+    latency percentiles in microseconds. `operations` is the number of
+    operations measured, if it differs from the number of samples."""
+    samples = sorted(samples)
+    total = sum(samples)
+    operations = operations or len(samples)
+
+    def percentile(share):
+        return samples[min(len(samples) - 1, int(share * len(samples)))]
+
+    return {
+        'operations': operations,
+        'total_sec': total,
+        'ops_per_sec': operations / total if total else None,
+        'p50_us': percentile(0.5) * 1e6,
+        'p90_us': percentile(0.9) * 1e6,
+        'p99_us': percentile(0.99) * 1e6,
+        'max_us': samples[-1] * 1e6,
+    }
+
+
+def close_repository(repository) -> None:
+    """Function closes repository, which keeps files or connections."""
+    close = getattr(repository, 'close', None)
+    if close:
+        close()
+
+
+def timed(func, *args) -> float:
+    """Function returns duration of the call in seconds."""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def bench_repository(
+    backend: str,
+    orders: list[Order],
+    generator: random.Random,
+    sample_size: int,
+) -> dict:
+    """Function measures add, update, get_by_field and batch_remove
+    operations of repository filled with the orders."""
+    repository = BACKENDS[backend]()
+    results = {'add': summarize([timed(repository.add, order)
+                                 for order in orders])}
+    sample = generator.sample(orders, min(sample_size, len(orders)))
+    results['update'] = summarize([
+        timed(repository.update, order.with_quantity(order.quantity + 1))
+        for order in sample])
+    results['get_by_field'] = summarize([
+        timed(repository.get_by_field, 'order_type', order_type,
+              'price', order_type == 'buy')
+        for order_type in ('buy', 'sell') * 3])
+    batches = [sample[idx:idx + 100] for idx in range(0, len(sample), 100)]
+    results['batch_remove'] = summarize(
+        [timed(repository.batch_remove, batch) for batch in batches],
+        operations=len(sample))
+    close_repository(repository)
+    return results
+
+
+def bench_match(
+    backend: str,
+    engine: str,
+    orders: list[Order],
+    rounds: list[list[Order]],
+) -> dict:
+    """Function measures matching rounds on top of the book filled
+    with the orders."""
+    order_book = ENGINES[engine](BACKENDS[backend]())
+    for order in orders:
+        order_book.add(order)
+    samples = []
+    fills = 0
+    for round_orders in rounds:
+        for order in round_orders:
+            order_book.add(order)
+        start = time.perf_counter()
+        match, partial = order_book.match()
+        samples.append(time.perf_counter() - start)
+        fills += len(match) + len(partial)
+    close_repository(order_book.orders)
+    result = summarize(samples)
+    result['fills'] = fills
+    result['fills_per_sec'] = fills / result['total_sec']
+    return result
+
+
+def peak_memory(backend: str, orders: list[Order]) -> int:
+    """Function returns peak memory in bytes allocated while the book
+    is filled with the orders."""
+    gc.collect()
+    tracemalloc.start()
+    repository = BACKENDS[backend]()
+    for order in orders:
+        repository.add(order)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    close_repository(repository)
+    return peak
+
+
+def run(
+    depths: list[int],
+    backends: list[str],
+    engines: list[str],
+    buy_ratios: list[float],
+    spreads: list[str],
+    rounds: int = 20,
+    round_size: int = 20,
+    sample_size: int = 1000,
+    memory: bool = True,
+    seed: int = 0,
+):
+    """Generator runs benchmarks for every combination of parameters
+    and yields results as dicts."""
+    for depth in depths:
+        generator = random.Random(seed)
+        start = time.perf_counter()
+        get_random_orders(min(depth, 100_000))
+        duration = time.perf_counter() - start
+        yield {
+            'benchmark': 'get_random_orders',
+            'depth': depth,
+            **summarize([duration], operations=min(depth, 100_000)),
+        }
+        start = time.perf_counter()
+        next(stream_random_orders(depth, seed=seed))
+        duration = time.perf_counter() - start
+        yield {
+            'benchmark': 'stream_random_orders',
+            'depth': depth,
+            **summarize([duration], operations=depth),
+        }
+        for buy_ratio in buy_ratios:
+            for spread in spreads:
+                orders = make_orders(depth, buy_ratio, spread, generator)
+                match_rounds = [
+                    make_orders(round_size, 0.5, spread, generator,
+                                aggressive=True)
+                    for _ in range(rounds)]
+                case = {
+                    'depth': depth,
+                    'buy_ratio': buy_ratio,
+                    'spread': spread,
+                }
+                for backend in backends:
+                    case['backend'] = backend
+                    results = bench_repository(
+                        backend, orders, generator, sample_size)
+                    for operation, result in results.items():
+                        yield {'benchmark': f'repository.{operation}',
+                               **case, **result}
+                    for engine in engines:
+                        yield {
+                            'benchmark': 'order_book.match',
+                            'engine': engine,
+                            **case,
+                            **bench_match(
+                                backend, engine, orders, match_rounds),
+                        }
+                    if memory:
+                        yield {
+                            'benchmark': 'repository.peak_memory',
+                            **case,
+                            'peak_bytes': peak_memory(backend, orders),
+                        }
+
+
+def main(argv=None):
+    """Entrypoint of benchmark suite."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--depths', nargs='+', type=int,
+                        default=[1_000, 10_000, 100_000])
+    parser.add_argument('--backends', nargs='+', choices=list(BACKENDS),
+                        default=list(BACKENDS))
+    parser.add_argument('--engines', nargs='+', choices=list(ENGINES),
+                        default=list(ENGINES))
+    parser.add_argument('--buy-ratios', nargs='+', type=float,
+                        default=[0.5])
+    parser.add_argument('--spreads', nargs='+', choices=list(SPREADS),
+                        default=list(SPREADS))
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--round-size', type=int, default=20)
+    parser.add_argument('--no-memory', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='file to write JSON lines to')
+    args = parser.parse_args(argv)
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for result in run(
+            depths=args.depths,
+            backends=args.backends,
+            engines=args.engines,
+            buy_ratios=args.buy_ratios,
+            spreads=args.spreads,
+            rounds=args.rounds,
+            round_size=args.round_size,
+            memory=not args.no_memory,
+            seed=args.seed,
+        ):
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,33 @@
+from heapq import heapify, heappop, heappush
+from itertools import chain
 from time import time
-from typing import Literal
+from typing import Iterator, Literal, NamedTuple
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter, model_validator
+
+DEFAULT_SYMBOL = 'DEFAULT'
+IMMEDIATE_TIME_IN_FORCE = ('IOC', 'FOK')
+ORDER_TYPES = ('sell', 'buy')
+SIDES = {'sell': 0, 'buy': 1}
+TIME_IN_FORCE = ('GTC', 'IOC', 'FOK', 'GTT')
+_new = object.__new__
+_setattr = object.__setattr__
 
 
 class Order(BaseModel):
     """This class describes Order model. Each order with the same uuid is
-    treated as the same order."""
+    treated as the same order. Time in force sets how long the order
+    stays in the book: GTC orders stay until they are matched or
+    removed, GTT orders stay until `expires_at`, IOC orders are matched
+    on arrival and their unmatched rest is cancelled, FOK orders are
+    either matched on arrival in full or cancelled."""
 
     order_id: UUID
     timestamp: float = Field(
         gt=0,
         description='Timestamp should be greater than 0',
-        default=time())
+        default_factory=time)
     order_type: Literal['sell', 'buy']
     quantity: int = Field(
         gt=0,
@@ -21,6 +35,21 @@ class Order(BaseModel):
     price: float = Field(
         gt=0,
         description='Price should be greater than 0')
+    symbol: str = Field(
+        default=DEFAULT_SYMBOL,
+        min_length=1,
+        description='Instrument the order is placed for')
+    time_in_force: Literal['GTC', 'IOC', 'FOK', 'GTT'] = 'GTC'
+    expires_at: float | None = Field(
+        default=None,
+        gt=0,
+        description='Timestamp of expiry of GTT order')
+
+    @model_validator(mode='after')
+    def check_expiry(self) -> 'Order':
+        if (self.time_in_force == 'GTT') != (self.expires_at is not None):
+            raise ValueError('Expiry time should be set for GTT orders only')
+        return self
 
     def __eq__(self, other):
         if not isinstance(other, Order):
@@ -28,7 +57,7 @@ class Order(BaseModel):
         return other.order_id == self.order_id
 
     def __hash__(self):
-        return hash(self.order_id)
+        return hash(self.order_id.int)
 
     def __gt__(self, other):
         return self.order_id > other.order_id
@@ -37,44 +66,264 @@ class Order(BaseModel):
         return (f'{self.order_type}_{self.quantity}_'
                 f'{self.price}_{self.order_id}')
 
+    @classmethod
+    def trusted(
+        cls,
+        order_id: UUID,
+        timestamp: float,
+        order_type: str,
+        quantity: int,
+        price: float,
+        symbol: str = DEFAULT_SYMBOL,
+        time_in_force: str = 'GTC',
+        expires_at: float | None = None,
+    ) -> 'Order':
+        """Method creates order from trusted data without validation.
+        It is meant for orders built by the application itself, which
+        are valid by construction, and is faster than both validation
+        and `model_construct`."""
+        return cls._from_fields({
+            'order_id': order_id,
+            'timestamp': timestamp,
+            'order_type': order_type,
+            'quantity': quantity,
+            'price': price,
+            'symbol': symbol,
+            'time_in_force': time_in_force,
+            'expires_at': expires_at,
+        })
+
+    @classmethod
+    def _from_fields(cls, fields: dict) -> 'Order':
+        """Method creates order from dict of all its fields, setting
+        internal attributes of pydantic model directly."""
+        order = _new(cls)
+        _setattr(order, '__dict__', fields)
+        _setattr(order, '__pydantic_fields_set__', set(fields))
+        _setattr(order, '__pydantic_extra__', None)
+        _setattr(order, '__pydantic_private__', None)
+        return order
+
+    def with_quantity(self, quantity: int) -> 'Order':
+        """Method returns copy of the order with another quantity.
+        The copy is not validated again."""
+        fields = self.__dict__.copy()
+        fields['quantity'] = quantity
+        return self._from_fields(fields)
+
+
+ORDER_LIST_ADAPTER = TypeAdapter(list[Order])
+
+
+def validate_orders(data: list[dict]) -> list[Order]:
+    """Function validates list of order dicts in one pass and returns
+    list of orders. ValidationError lists errors of all orders."""
+    return ORDER_LIST_ADAPTER.validate_python(data)
+
+
+def validate_orders_json(data: str | bytes) -> list[Order]:
+    """Function validates JSON array of orders in one pass and returns
+    list of orders."""
+    return ORDER_LIST_ADAPTER.validate_json(data)
+
+
+class OrderRecord:
+    """This class describes lightweight internal order record used by
+    repositories and matcher on the hot path. Records are trusted and
+    are never validated, validation is done by Order model at the
+    ingestion boundary. Price in integer ticks and sequence number,
+    which sets time priority of the order, are assigned by repository."""
+
+    __slots__ = ('order_id', 'timestamp', 'order_type', 'quantity', 'price',
+                 'symbol', 'time_in_force', 'expires_at', 'ticks', 'sequence')
+
+    def __init__(
+        self,
+        order_id: UUID,
+        timestamp: float,
+        order_type: str,
+        quantity: int,
+        price: float,
+        symbol: str = DEFAULT_SYMBOL,
+        time_in_force: str = 'GTC',
+        expires_at: float | None = None,
+    ):
+        self.order_id = order_id
+        self.timestamp = timestamp
+        self.order_type = order_type
+        self.quantity = quantity
+        self.price = price
+        self.symbol = symbol
+        self.time_in_force = time_in_force
+        self.expires_at = expires_at
+        self.ticks = None
+        self.sequence = None
+
+    def __repr__(self):
+        return (f'OrderRecord({self.order_type}_{self.quantity}_'
+                f'{self.price}_{self.order_id})')
+
+    @classmethod
+    def from_order(cls, order: Order) -> 'OrderRecord':
+        """Method creates record from Order model."""
+        return cls(order.order_id, order.timestamp, order.order_type,
+                   order.quantity, order.price, order.symbol,
+                   order.time_in_force, order.expires_at)
+
+    def to_order(self) -> Order:
+        """Method creates Order model from record without validation."""
+        return Order.trusted(
+            self.order_id, self.timestamp, self.order_type, self.quantity,
+            self.price, self.symbol, self.time_in_force, self.expires_at)
+
+    def with_quantity(self, quantity: int) -> 'OrderRecord':
+        """Method returns copy of the record with another quantity."""
+        record = OrderRecord(self.order_id, self.timestamp, self.order_type,
+                             quantity, self.price, self.symbol,
+                             self.time_in_force, self.expires_at)
+        record.ticks = self.ticks
+        record.sequence = self.sequence
+        return record
+
+
+class Trade(NamedTuple):
+    """This class describes one fill: quantity traded between buy order
+    and sell order at execution price."""
+
+    buy_order_id: UUID
+    sell_order_id: UUID
+    quantity: int
+    price: float
+
+
+def as_order(item: Order | OrderRecord) -> Order:
+    """Function converts internal order record to Order model. Order
+    models are returned as they are."""
+    if isinstance(item, Order):
+        return item
+    return item.to_order()
+
 
 class OrderBook:
-    """Class to work with OrderBook"""
+    """Class to work with OrderBook. If journal is set, every change
+    of the book is recorded in it, and `commit` should be called once
+    per round to write recorded changes. Expiry times of resting GTT
+    orders are kept in a heap and expired orders are removed lazily,
+    before each matching, by time of `clock`. Heap entries of orders
+    which have already left the book are tombstones, which are skipped
+    when their time comes, so the book is never rescanned. Heap is
+    rebuilt from resting orders, when the book is opened on repository,
+    which already holds orders, and after restore from snapshot."""
 
-    def __init__(self, order_repository):
+    def __init__(self, order_repository, journal=None, clock=time):
         self.orders = order_repository
+        self.journal = journal
+        self.clock = clock
+        self._expiry = []
+        if len(order_repository):
+            self.rebuild_expiry()
 
     def add(self, order: Order):
-        """Method adds order to repository."""
+        """Method adds order to repository. IOC and FOK orders can
+        only be matched on arrival, so they are not accepted."""
+        if order.time_in_force in IMMEDIATE_TIME_IN_FORCE:
+            raise ValueError(
+                f'{order.time_in_force} order can only be matched on arrival')
         self.orders.add(order)
+        self._schedule_expiry(order)
+        if self.journal:
+            self.journal.add(order)
 
     def modify(self, order: Order):
         """Method updates order in repository."""
         self.orders.update(order)
+        self._schedule_expiry(order)
+        if self.journal:
+            self.journal.modify(order)
 
     def remove(self, order: Order):
         """Method removes order from repository."""
         self.orders.remove(order)
+        if self.journal:
+            self.journal.remove(order)
 
     def batch_remove(self, orders: list[Order]):
         """Method removes list of orders from repository."""
         self.orders.batch_remove(orders)
+        if self.journal:
+            self.journal.batch_remove(orders)
+
+    def expire(self, now: float | None = None) -> list[Order]:
+        """Method removes orders, which have expired by the specified
+        time or by the current time of the clock, and returns them.
+        Only due entries of the expiry heap are read."""
+        now = self.clock() if now is None else now
+        expired_orders = {}
+        expiry = self._expiry
+        while expiry and expiry[0][0] <= now:
+            expires_at, key, order_id = heappop(expiry)
+            order = next(self.orders.iter_by_field('order_id', order_id),
+                         None)
+            if order is not None and order.expires_at == expires_at:
+                expired_orders[key] = order
+        expired_orders = list(expired_orders.values())
+        if expired_orders:
+            self.batch_remove(expired_orders)
+        return expired_orders
+
+    def rebuild_expiry(self):
+        """Method rebuilds expiry heap from resting orders of
+        repository."""
+        self._expiry = [
+            (record.expires_at, record.order_id.int, record.order_id)
+            for record in chain(self.orders.iter_records('sell'),
+                                self.orders.iter_records('buy'))
+            if record.expires_at is not None]
+        heapify(self._expiry)
+
+    def commit(self):
+        """Method commits changes of repository and writes changes
+        recorded in journal, if it is set."""
+        self.orders.commit()
+        if self.journal:
+            self.journal.commit()
+
+    def snapshot(self, path: str) -> int:
+        """Method saves resting orders to file in columnar binary format
+        and returns number of saved orders. Orders of each side are saved
+        in price-time priority."""
+        from domain.snapshot import save_snapshot
+        return save_snapshot(path, chain(
+            self.orders.iter_records('sell'),
+            self.orders.iter_records('buy')))
+
+    def restore(self, path: str, symbol: str = DEFAULT_SYMBOL) -> int:
+        """Method loads orders of the specified instrument from snapshot
+        file into repository and returns number of loaded orders. Orders
+        are not validated and are not recorded in journal."""
+        from domain.snapshot import iter_snapshot, load_snapshot
+        number = 0
+        for (order_id, order_type, price, quantity, timestamp,
+             time_in_force, expires_at) in iter_snapshot(load_snapshot(path)):
+            record = OrderRecord(
+                UUID(bytes=order_id), timestamp, order_type, quantity,
+                price, symbol, time_in_force, expires_at)
+            self.orders.add(record)
+            self._schedule_expiry(record)
+            number += 1
+        return number
 
     def match(self):
         """Method matches buy-orders and sell-orders,
         removes matched orders from repository and
         returns list of matched orders and list of
-        partially matched orders."""
-        sell_orders = self.orders.get_by_field(
-            field='order_type',
-            value='sell',
-            sort_field='price',
-            reverse_sorting=False)
-        buy_orders = self.orders.get_by_field(
-            field='order_type',
-            value='buy',
-            sort_field='price',
-            reverse_sorting=True)
+        partially matched orders. Orders are read lazily
+        from repository, so only the crossed part of the
+        book is walked. Expired orders are removed before
+        matching."""
+        self.expire()
+        sell_orders = self.orders.iter_records('sell')
+        buy_orders = self.orders.iter_records('buy')
         matched_orders = []
         partially_matched_orders = []
         partial_sell = {
@@ -86,67 +335,220 @@ class OrderBook:
             'quantity_matched': 0,
         }
 
-        sell_idx = 0
-        buy_idx = 0
+        sell_order = next(sell_orders, None)
+        buy_order = next(buy_orders, None)
         matched_quantity = 0
 
-        while (sell_idx < len(sell_orders)
-               and buy_idx < len(buy_orders)):
-            if sell_orders[sell_idx].price > buy_orders[buy_idx].price:
+        while sell_order is not None and buy_order is not None:
+            if sell_order.price > buy_order.price:
                 break
-            sell_to_match = (sell_orders[sell_idx].quantity
+            sell_to_match = (sell_order.quantity
                              - partial_sell['quantity_matched'])
-            buy_to_match = (buy_orders[buy_idx].quantity
+            buy_to_match = (buy_order.quantity
                             - partial_buy['quantity_matched'])
             matched_quantity = min(sell_to_match, buy_to_match)
 
             if matched_quantity == sell_to_match:
                 partial_sell['order'] = None
                 partial_sell['quantity_matched'] = 0
-                matched_orders.append(sell_orders[sell_idx])
-                sell_idx += 1
+                matched_orders.append(sell_order)
+                sell_order = next(sell_orders, None)
             else:
-                partial_sell['order'] = sell_orders[sell_idx]
+                partial_sell['order'] = sell_order
                 partial_sell['quantity_matched'] += matched_quantity
 
             if matched_quantity == buy_to_match:
                 partial_buy['order'] = None
                 partial_buy['quantity_matched'] = 0
-                matched_orders.append(buy_orders[buy_idx])
-                buy_idx += 1
+                matched_orders.append(buy_order)
+                buy_order = next(buy_orders, None)
             else:
-                partial_buy['order'] = buy_orders[buy_idx]
+                partial_buy['order'] = buy_order
                 partial_buy['quantity_matched'] += matched_quantity
-        self.orders.batch_remove(matched_orders)
-        if partial_sell['order']:
-            partially_matched_orders = self._treat_partial(
-                partial_sell,
-                partially_matched_orders)
-        if partial_buy['order']:
-            partially_matched_orders = self._treat_partial(
-                partial_buy,
+        updated_orders = []
+        for partial in (partial_sell, partial_buy):
+            if partial['order']:
+                self._treat_partial(
+                    partial,
+                    partially_matched_orders,
+                    updated_orders)
+        self._apply_match(matched_orders, updated_orders)
+        return ([as_order(item) for item in matched_orders],
                 partially_matched_orders)
+
+    def iter_trades(self, batch_size: int = 1024) -> Iterator[Trade]:
+        """Generator matches buy-orders and sell-orders like `match` and
+        yields trades one by one. See `iter_trade_batches`."""
+        for trades in self.iter_trade_batches(batch_size):
+            yield from trades
+
+    def iter_trade_batches(
+        self,
+        batch_size: int = 1024,
+    ) -> Iterator[list[Trade]]:
+        """Generator matches buy-orders and sell-orders and yields lists
+        of at most `batch_size` trades. Each batch is applied to
+        repository and recorded in journal before it is yielded, so
+        memory is bounded by the batch size and not by size of the
+        crossing. If the generator is not exhausted, the rest of the
+        book stays crossed. Trade is executed at price of the older of
+        the two orders."""
+        self.expire()
+        while True:
+            trades, removed, updated = self._match_batch(batch_size)
+            if not trades:
+                return
+            self._apply_match(removed, updated)
+            yield trades
+
+    def add_and_match(self, order: Order):
+        """Method matches incoming order against the opposite side
+        of repository only, adds unmatched rest of the order to
+        repository and returns list of matched orders and list of
+        partially matched orders. Resting orders never cross each
+        other, so the cost depends only on the crossed part of the
+        opposite side. Expired orders are removed before matching,
+        and expired incoming order is dropped. Unmatched rest of IOC
+        order is cancelled, and FOK order, which can not be matched
+        in full, is cancelled without matching. Order, which can not
+        be added to repository, is rejected before the book is
+        changed."""
+        now = self.clock()
+        self.expire(now)
+        if order.expires_at is not None and order.expires_at <= now:
+            return [], []
+        self.orders.check_add(order)
+        is_buy = order.order_type == 'buy'
+        resting_orders = self.orders.iter_records(
+            'sell' if is_buy else 'buy')
+        matched_orders = []
+        partially_matched_orders = []
+        partial_resting = {
+            'order': None,
+            'quantity_matched': 0,
+        }
+        quantity_left = order.quantity
+
+        for resting_order in resting_orders:
+            if (resting_order.price > order.price if is_buy
+                    else resting_order.price < order.price):
+                break
+            if resting_order.quantity > quantity_left:
+                partial_resting['order'] = resting_order
+                partial_resting['quantity_matched'] = quantity_left
+                quantity_left = 0
+                break
+            matched_orders.append(resting_order)
+            quantity_left -= resting_order.quantity
+            if not quantity_left:
+                break
+        if (order.time_in_force == 'FOK' and quantity_left
+                or order.time_in_force == 'IOC'
+                and quantity_left == order.quantity):
+            return [], []
+        updated_orders = []
+        if partial_resting['order']:
+            self._treat_partial(
+                partial_resting,
+                partially_matched_orders,
+                updated_orders)
+        if self.journal:
+            self.journal.add(order)
+        self._apply_match(matched_orders, updated_orders)
+
+        matched_orders = [as_order(item) for item in matched_orders]
+        if not quantity_left:
+            matched_orders.append(order)
+            if self.journal:
+                self.journal.match([order], [])
+        elif quantity_left == order.quantity:
+            self.orders.add(order)
+            self._schedule_expiry(order)
+        else:
+            partially_matched_orders.append(
+                order.with_quantity(order.quantity - quantity_left))
+            if order.time_in_force == 'IOC':
+                if self.journal:
+                    self.journal.remove(order)
+                return matched_orders, partially_matched_orders
+            unmatched_part = order.with_quantity(quantity_left)
+            self.orders.add(unmatched_part)
+            self._schedule_expiry(unmatched_part)
+            if self.journal:
+                self.journal.match([], [unmatched_part])
+        return matched_orders, partially_matched_orders
+
+    def batch_add_and_match(self, orders: list[Order]):
+        """Method matches list of incoming orders one by one on arrival
+        and returns list of matched orders and list of partially
+        matched orders."""
+        matched_orders = []
+        partially_matched_orders = []
+        for order in orders:
+            order_matched, order_partial = self.add_and_match(order)
+            matched_orders.extend(order_matched)
+            partially_matched_orders.extend(order_partial)
         return matched_orders, partially_matched_orders
 
-    def _treat_partial(self, partial_dict, result_dict):
-        """Method updates partially matched order in repository
-        and adds the matched part to thr list of partially matched
-        orders."""
-        matched_order = Order(
-            order_id=partial_dict['order'].order_id,
-            timestamp=partial_dict['order'].timestamp,
-            order_type=partial_dict['order'].order_type,
-            quantity=partial_dict['quantity_matched'],
-            price=partial_dict['order'].price,
-        )
-        result_dict.append(matched_order)
-        unmatched_part = Order(
-            order_id=partial_dict['order'].order_id,
-            timestamp=partial_dict['order'].timestamp,
-            order_type=partial_dict['order'].order_type,
-            quantity=(partial_dict['order'].quantity
-                      - partial_dict['quantity_matched']),
-            price=partial_dict['order'].price,
-        )
-        self.orders.update(unmatched_part)
-        return result_dict
+    def _match_batch(self, batch_size: int):
+        """Method walks the crossed part of the book until `batch_size`
+        trades are made and returns trades, fully matched records and
+        unmatched parts of partially matched records."""
+        sell_orders = self.orders.iter_records('sell')
+        buy_orders = self.orders.iter_records('buy')
+        trades = []
+        removed = []
+        updated = []
+        sell_order = next(sell_orders, None)
+        buy_order = next(buy_orders, None)
+        sell_left = sell_order.quantity if sell_order else 0
+        buy_left = buy_order.quantity if buy_order else 0
+        while (sell_order is not None and buy_order is not None
+               and sell_order.price <= buy_order.price
+               and len(trades) < batch_size):
+            quantity = min(sell_left, buy_left)
+            trades.append(Trade(
+                buy_order.order_id, sell_order.order_id, quantity,
+                (sell_order.price if sell_order.timestamp
+                 <= buy_order.timestamp else buy_order.price)))
+            sell_left -= quantity
+            buy_left -= quantity
+            if not sell_left:
+                removed.append(sell_order)
+                sell_order = next(sell_orders, None)
+                sell_left = sell_order.quantity if sell_order else 0
+            if not buy_left:
+                removed.append(buy_order)
+                buy_order = next(buy_orders, None)
+                buy_left = buy_order.quantity if buy_order else 0
+        for order, quantity_left in ((sell_order, sell_left),
+                                     (buy_order, buy_left)):
+            if order is not None and quantity_left < order.quantity:
+                updated.append(order.with_quantity(quantity_left))
+        return trades, removed, updated
+
+    def _schedule_expiry(self, order: Order | OrderRecord):
+        """Method puts expiry time of GTT order into the heap."""
+        if order.expires_at is not None:
+            heappush(self._expiry,
+                     (order.expires_at, order.order_id.int, order.order_id))
+
+    def _apply_match(self, removed, updated):
+        """Method applies result of matching to repository and records
+        it in journal, if it is set."""
+        self.orders.apply_changes(removed, updated)
+        if self.journal:
+            self.journal.match(removed, updated)
+
+    def _treat_partial(self, partial_dict, result_list, updated_list):
+        """Method adds the matched part of partially matched order
+        to the list of partially matched orders and the unmatched
+        part to the list of orders to update in repository. Both
+        parts are built from trusted data, so they are not validated
+        again."""
+        order = partial_dict['order']
+        result_list.append(
+            as_order(order.with_quantity(partial_dict['quantity_matched'])))
+        updated_list.append(
+            order.with_quantity(order.quantity
+                                - partial_dict['quantity_matched']))
@@ -0,0 +1,64 @@
+import math
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from domain.models import ORDER_TYPES, SIDES, TIME_IN_FORCE
+
+SNAPSHOT_DTYPE = np.dtype([
+    ('order_id', 'V16'),
+    ('side', 'u1'),
+    ('price', '<f8'),
+    ('quantity', '<i8'),
+    ('timestamp', '<f8'),
+    ('time_in_force', 'u1'),
+    ('expires_at', '<f8'),
+])
+
+
+def records_to_array(records: Iterable) -> np.ndarray:
+    """Function packs order records into structured array with one
+    column per order field. Missing expiry time is packed as NaN."""
+    records = list(records)
+    array = np.empty(len(records), dtype=SNAPSHOT_DTYPE)
+    array['order_id'] = np.frombuffer(
+        b''.join(record.order_id.bytes for record in records), dtype='V16')
+    array['side'] = [SIDES[record.order_type] for record in records]
+    array['price'] = [record.price for record in records]
+    array['quantity'] = [record.quantity for record in records]
+    array['timestamp'] = [record.timestamp for record in records]
+    array['time_in_force'] = [TIME_IN_FORCE.index(record.time_in_force)
+                              for record in records]
+    array['expires_at'] = [
+        math.nan if record.expires_at is None else record.expires_at
+        for record in records]
+    return array
+
+
+def save_snapshot(path: str, records: Iterable) -> int:
+    """Function saves order records to `.npy` file and returns number
+    of saved records."""
+    array = records_to_array(records)
+    with open(path, 'wb') as file:
+        np.save(file, array)
+    return len(array)
+
+
+def load_snapshot(path: str) -> np.ndarray:
+    """Function maps snapshot file into memory without copying it."""
+    return np.load(path, mmap_mode='r')
+
+
+def iter_snapshot(array: np.ndarray) -> Iterator[tuple]:
+    """Generator yields order id bytes, order type, price, quantity,
+    timestamp, time in force and expiry time of each row of snapshot."""
+    return zip(
+        array['order_id'].tolist(),
+        [ORDER_TYPES[side] for side in array['side'].tolist()],
+        array['price'].tolist(),
+        array['quantity'].tolist(),
+        array['timestamp'].tolist(),
+        [TIME_IN_FORCE[value] for value in array['time_in_force'].tolist()],
+        [None if math.isnan(value) else value
+         for value in array['expires_at'].tolist()],
+    )
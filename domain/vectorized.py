@@ -0,0 +1,118 @@
+import numpy as np
+
+from domain.models import OrderBook, as_order
+
+
+class VectorizedOrderBook(OrderBook):
+    """OrderBook which finds the volume of the crossed part of the book
+    with NumPy. Crossed records are still read from the repository one
+    by one, and matched orders are converted and removed one by one, as
+    in `OrderBook.match`: only the crossing volume is computed on arrays
+    of prices and quantities, with cumulative sums and searchsorted.
+    These per-order steps take most of the time, so the engine is not
+    faster than `OrderBook.match`: on a fully crossed book of 100k
+    orders per side it takes 2.8 s against 3.1 s with price level
+    repository and 1.3 s against 1.1 s with simple repository. Result
+    is the same as the one of `OrderBook.match`."""
+
+    def match(self):
+        """Method matches buy-orders and sell-orders,
+        removes matched orders from repository and
+        returns list of matched orders and list of
+        partially matched orders. Expired orders are removed
+        before matching."""
+        self.expire()
+        best_buy = self.orders.get_best('buy')
+        best_sell = self.orders.get_best('sell')
+        if (best_buy is None or best_sell is None
+                or best_sell.price > best_buy.price):
+            return [], []
+        sell_orders, buy_orders = self._read_crossable(
+            self.orders.iter_records('sell'),
+            self.orders.iter_records('buy'))
+        sell_prices, sell_starts, sell_ends = self._to_arrays(sell_orders)
+        buy_prices, buy_starts, buy_ends = self._to_arrays(buy_orders)
+
+        volume = self._crossing_volume(
+            sell_prices, sell_starts, sell_ends,
+            buy_prices, buy_starts, buy_ends)
+        sells_matched = int(np.searchsorted(sell_ends, volume, 'right'))
+        buys_matched = int(np.searchsorted(buy_ends, volume, 'right'))
+        matched_orders = (sell_orders[:sells_matched]
+                          + buy_orders[:buys_matched])
+
+        partially_matched_orders = []
+        updated_orders = []
+        for orders, starts, matched in (
+            (sell_orders, sell_starts, sells_matched),
+            (buy_orders, buy_starts, buys_matched),
+        ):
+            if matched < len(orders) and starts[matched] < volume:
+                self._treat_partial(
+                    {
+                        'order': orders[matched],
+                        'quantity_matched': int(volume - starts[matched]),
+                    },
+                    partially_matched_orders,
+                    updated_orders)
+        self._apply_match(matched_orders, updated_orders)
+        return ([as_order(item) for item in matched_orders],
+                partially_matched_orders)
+
+    @staticmethod
+    def _read_crossable(sell_records, buy_records):
+        """Method reads records of both sides which can be matched,
+        advancing the side with the smaller read volume. Each record
+        read is checked against the last read record of the other side,
+        so reading stops at the first pair which does not cross and
+        only the crossed part of the book is read."""
+        sell_orders = [next(sell_records)]
+        buy_orders = [next(buy_records)]
+        sell_volume = sell_orders[0].quantity
+        buy_volume = buy_orders[0].quantity
+        while True:
+            if sell_volume <= buy_volume:
+                record = next(sell_records, None)
+                if record is None or record.price > buy_orders[-1].price:
+                    break
+                sell_orders.append(record)
+                sell_volume += record.quantity
+            else:
+                record = next(buy_records, None)
+                if record is None or sell_orders[-1].price > record.price:
+                    break
+                buy_orders.append(record)
+                buy_volume += record.quantity
+        return sell_orders, buy_orders
+
+    @staticmethod
+    def _to_arrays(orders):
+        """Method returns arrays of prices, cumulative start positions
+        and cumulative end positions of orders."""
+        prices = np.fromiter((item.price for item in orders),
+                             dtype=np.float64, count=len(orders))
+        quantities = np.fromiter((item.quantity for item in orders),
+                                 dtype=np.int64, count=len(orders))
+        ends = np.cumsum(quantities)
+        return prices, ends - quantities, ends
+
+    @staticmethod
+    def _crossing_volume(sell_prices, sell_starts, sell_ends,
+                         buy_prices, buy_starts, buy_ends) -> int:
+        """Method returns total volume matched by the two-pointer walk.
+        The pair of orders changes only where a sell or a buy order
+        starts, so crossing is checked at those positions only and the
+        first position where the sell price exceeds the buy price
+        limits the volume."""
+        volume = min(sell_ends[-1], buy_ends[-1])
+        sell_starts = sell_starts[sell_starts < volume]
+        buy_starts = buy_starts[buy_starts < volume]
+        buy_idx = np.searchsorted(buy_ends, sell_starts, 'right')
+        sell_idx = np.searchsorted(sell_ends, buy_starts, 'right')
+        not_crossed = np.concatenate((
+            sell_starts[sell_prices[:len(sell_starts)] > buy_prices[buy_idx]],
+            buy_starts[sell_prices[sell_idx] > buy_prices[:len(buy_starts)]],
+        ))
+        if len(not_crossed):
+            volume = min(volume, not_crossed.min())
+        return int(volume)
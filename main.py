@@ -1,9 +1,20 @@
+import argparse
+import os
 import random
 import time
+from typing import Iterator
 from uuid import uuid4
 
 from domain.models import Order, OrderBook
-from repository.repository import SimpleOrderRepository
+from orderflow.generators import stream_random_orders
+from orderflow.stochastic import FlowBatch, StochasticOrderFlow
+from repository.journal import OrderJournal, replay_journal
+from repository.repository import PriceLevelOrderRepository
+from repository.sqlite_repository import SQLiteOrderRepository
+from repository.tiered_repository import TieredOrderRepository
+from service.metrics import (MetricsRecorder, instrument_generator,
+                             instrument_order_book)
+from service.reporting import VERBOSITY, ReportWriter, format_round_report
 
 
 def print_result_message(
@@ -16,65 +27,267 @@ def print_result_message(
     """Function prints message with the results of trade in
     the specified round."""
     end_string = '\n' + '-' * 20 + '\n'
-    separator = '-' * 20
-    print(f'Round {market_round}', end=end_string)
-    print('Matched orders:')
-    for item in matched_list:
-        print(item)
-    print(separator)
-    print('Partially  matched orders:')
-    for item in partial_list:
-        print(item)
-    print(separator)
-    print('Summary:')
-    print(f'Orders added: {added_orders}')
-    print(f'Orders matched in full: {len(matched_list)}')
-    print(f'Orders matched in part: {len(partial_list)}')
-    print(f'Orders unmatched: {unmatched_orders}', end=end_string)
-    print('To interrupt simulation press Ctrl+C', end=end_string)
-
-
-def get_random_orders(order_number: int):
-    """Function generates the list of random orders."""
+    print(format_round_report(market_round, added_orders, matched_list,
+                              partial_list, unmatched_orders)
+          + 'To interrupt simulation press Ctrl+C' + end_string, end='')
+
+
+def print_stats_message(stats: dict) -> None:
+    """Function prints one line of aggregate statistics of
+    headless simulation."""
+    print(' '.join(f'{key}={value}' for key, value in stats.items()),
+          flush=True)
+
+
+def get_random_orders(order_number: int, ttl: float | None = None):
+    """Function generates the list of random orders. Generated orders
+    are valid by construction, so they are not validated. If time to
+    live is set, orders are GTT orders, which expire after it."""
     orders = []
     for _ in range(order_number):
-        order = Order(
+        timestamp = time.time()
+        order = Order.trusted(
             order_id=uuid4(),
+            timestamp=timestamp,
             order_type=random.choice(('sell', 'buy')),
             quantity=random.randint(1, 500),
-            price=round(random.uniform(0.1, 100), 2)
+            price=round(random.uniform(0.1, 100), 2),
+            time_in_force='GTC' if ttl is None else 'GTT',
+            expires_at=None if ttl is None else timestamp + ttl,
         )
         orders.append(order)
     return orders
 
 
-def market_simulator(order_book: OrderBook):
-    """Function simulates market trade. After each round
-    functions generates report on completed deals."""
+def market_simulator(
+    order_book: OrderBook,
+    ttl: float | None = None,
+    reporter: ReportWriter | None = None,
+):
+    """Function simulates market trade. Each new order is matched
+    on arrival against the opposite side of the book. After each round
+    functions generates report on completed deals. If report writer is
+    set, reports are handed to it instead of being printed in the
+    matching loop. If time to live is set, unmatched orders expire
+    after it."""
     print('Welcome to market simulator')
+    report = reporter.submit if reporter else print_result_message
     market_round = 0
     while True:
         market_round += 1
-        order_list = get_random_orders(random.randint(15, 30))
-        for order in order_list:
-            order_book.add(order)
-        match, partial = order_book.match()
-        print_result_message(
+        order_list = get_random_orders(random.randint(15, 30), ttl)
+        match, partial = order_book.batch_add_and_match(order_list)
+        order_book.commit()
+        report(
             market_round=market_round,
             added_orders=len(order_list),
             matched_list=match,
             partial_list=partial,
-            unmatched_orders=len(order_book.orders.orders),
+            unmatched_orders=len(order_book.orders),
         )
         time.sleep(1)
 
 
-def main():
+def headless_simulator(
+    order_book: OrderBook,
+    rounds: int,
+    orders_per_round: int,
+    seed: int | None = None,
+    report_every: int = 0,
+    recorder: MetricsRecorder | None = None,
+    report=print_stats_message,
+    ttl: float | None = None,
+    flow: Iterator[FlowBatch] | None = None,
+) -> dict:
+    """Function simulates market trade as fast as possible: rounds
+    run back-to-back, without pauses and without printing of orders.
+    Orders are drawn in bulk by seeded NumPy generator. Aggregate
+    statistics are passed to `report` every `report_every` rounds, if
+    it is set, and returned at the end of simulation. If metrics
+    recorder is set, order book and generator are instrumented and
+    each round is recorded. If time to live is set, unmatched orders
+    expire after it. If flow is set, batches of orders and cancels are
+    taken from it instead of uniform random orders. Only cancels of
+    orders, which still rest in the book, are counted."""
+    stats = {
+        'rounds': 0,
+        'orders_added': 0,
+        'orders_matched': 0,
+        'orders_partial': 0,
+        'orders_cancelled': 0,
+        'orders_resting': 0,
+        'elapsed_sec': 0.0,
+        'orders_per_sec': 0.0,
+    }
+    start = time.perf_counter()
+    if flow is None:
+        flow = (FlowBatch(order_list, []) for order_list in
+                stream_random_orders(orders_per_round, seed=seed, ttl=ttl))
+    if recorder:
+        instrument_order_book(order_book, recorder)
+        flow = instrument_generator(flow, recorder)
+    for market_round, (order_list, cancels) in zip(
+            range(1, rounds + 1), flow):
+        if cancels:
+            resting_orders = len(order_book.orders)
+            order_book.batch_remove(cancels)
+            stats['orders_cancelled'] += (
+                resting_orders - len(order_book.orders))
+        match, partial = order_book.batch_add_and_match(order_list)
+        order_book.commit()
+        if recorder:
+            recorder.end_round(order_book)
+        stats['orders_added'] += len(order_list)
+        stats['orders_matched'] += len(match)
+        stats['orders_partial'] += len(partial)
+        if report_every and not market_round % report_every:
+            report(_update_stats(stats, market_round, order_book, start))
+    return _update_stats(stats, rounds, order_book, start)
+
+
+def _update_stats(
+    stats: dict,
+    market_round: int,
+    order_book: OrderBook,
+    start: float,
+) -> dict:
+    """Function updates running statistics of headless simulation."""
+    stats['rounds'] = market_round
+    stats['orders_resting'] = len(order_book.orders)
+    stats['elapsed_sec'] = round(time.perf_counter() - start, 3)
+    stats['orders_per_sec'] = round(
+        stats['orders_added'] / max(stats['elapsed_sec'], 1e-9))
+    return stats
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Function parses command line arguments."""
+    parser = argparse.ArgumentParser(description='Market simulator')
+    parser.add_argument('--headless', action='store_true',
+                        help='run rounds back-to-back and print only '
+                             'aggregate statistics')
+    parser.add_argument('--rounds', type=int, default=1000)
+    parser.add_argument('--orders-per-round', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--report-every', type=int, default=0,
+                        help='print statistics every N rounds')
+    parser.add_argument('--metrics',
+                        help='file to append JSON lines of metrics to '
+                             'on each report of headless simulation')
+    parser.add_argument('--prometheus',
+                        help='file to write metrics in Prometheus text '
+                             'format to on each report of headless '
+                             'simulation')
+    parser.add_argument('--journal',
+                        help='file of the journal of order book changes. '
+                             'Existing journal is replayed on start')
+    parser.add_argument('--flow', choices=('uniform', 'stochastic'),
+                        default='uniform',
+                        help='order flow of headless simulation: uniform '
+                             'random orders or stochastic flow around '
+                             'drifting mid price')
+    parser.add_argument('--cancel-ratio', type=float, default=0.0,
+                        help='mean number of cancellations per new order '
+                             'of stochastic flow')
+    parser.add_argument('--verbosity', choices=VERBOSITY, default='orders',
+                        help='detail of round reports: nothing, summary '
+                             'only or summary with orders')
+    parser.add_argument('--report-sample', type=int, default=1,
+                        help='report only every N round')
+    parser.add_argument('--report-file',
+                        help='file to write round reports to instead of '
+                             'stdout')
+    parser.add_argument('--report-max-bytes', type=int, default=0,
+                        help='size after which report file is rotated')
+    parser.add_argument('--ttl', type=float, default=None,
+                        help='seconds after which unmatched orders expire. '
+                             'Orders of stochastic flow expire in time of '
+                             'the flow. Orders never expire by default')
+    parser.add_argument('--max-orders', type=int, default=None,
+                        help='number of orders kept in memory. Deep price '
+                             'levels above it are spilled to disk')
+    parser.add_argument('--database',
+                        help='SQLite file to keep orders in. Changes are '
+                             'committed once per round. It can not be '
+                             'combined with journal, as both restore the '
+                             'book on start')
+    args = parser.parse_args(argv)
+    if args.database and args.journal:
+        parser.error('--database and --journal can not be used together')
+    if args.cancel_ratio < 0:
+        parser.error('--cancel-ratio must not be negative')
+    return args
+
+
+def main(argv=None):
     """This is the entrypoint of the app. Function initiates
     repository, Order Book and starts market simulation."""
-    test_repository = SimpleOrderRepository()
+    args = parse_args(argv)
+    if args.database:
+        test_repository = SQLiteOrderRepository(args.database)
+    elif args.max_orders:
+        test_repository = TieredOrderRepository(max_orders=args.max_orders)
+    else:
+        test_repository = PriceLevelOrderRepository()
     order_book = OrderBook(test_repository)
-    market_simulator(order_book)
+    if args.journal:
+        if os.path.exists(args.journal):
+            replay_journal(args.journal, order_book)
+        order_book.journal = OrderJournal(args.journal)
+    try:
+        if args.headless:
+            run_headless(args, order_book)
+        else:
+            with ReportWriter(args.report_file, args.verbosity,
+                              args.report_sample,
+                              max_bytes=args.report_max_bytes) as reporter:
+                market_simulator(order_book, args.ttl, reporter)
+    finally:
+        if order_book.journal:
+            order_book.journal.close()
+        close = getattr(test_repository, 'close', None)
+        if close:
+            close()
+
+
+def run_headless(args: argparse.Namespace, order_book: OrderBook) -> None:
+    """Function runs headless simulation with parsed command line
+    arguments and writes its metrics."""
+    recorder = None
+    metrics_file = None
+    if args.metrics or args.prometheus:
+        recorder = MetricsRecorder()
+    if args.metrics:
+        metrics_file = open(args.metrics, 'a')
+
+    def report(stats: dict) -> None:
+        print_stats_message(stats)
+        if metrics_file:
+            recorder.write_json_line(metrics_file)
+        if args.prometheus:
+            recorder.write_prometheus(args.prometheus)
+
+    flow = None
+    if args.flow == 'stochastic':
+        stochastic_flow = StochasticOrderFlow(
+            seed=args.seed, cancel_ratio=args.cancel_ratio, ttl=args.ttl)
+        order_book.clock = lambda: stochastic_flow.time
+        flow = stochastic_flow.stream(args.orders_per_round)
+    try:
+        report(headless_simulator(
+            order_book,
+            rounds=args.rounds,
+            orders_per_round=args.orders_per_round,
+            seed=args.seed,
+            report_every=args.report_every,
+            recorder=recorder,
+            report=report,
+            ttl=args.ttl,
+            flow=flow,
+        ))
+    finally:
+        if metrics_file:
+            metrics_file.close()
 
 
 if __name__ == '__main__':
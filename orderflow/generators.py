@@ -0,0 +1,96 @@
+from itertools import repeat
+from time import time
+from typing import Iterator
+from uuid import UUID
+
+import numpy as np
+
+from domain.models import DEFAULT_SYMBOL, ORDER_TYPES, Order
+
+ORDER_TYPE_NAMES = np.array(ORDER_TYPES)
+
+
+def random_ids(number: int, generator: np.random.Generator) -> np.ndarray:
+    """Function draws random version 4 UUIDs as rows of 16 bytes."""
+    ids = np.frombuffer(generator.bytes(16 * number), dtype=np.uint8)
+    ids = ids.reshape(number, 16).copy()
+    ids[:, 6] = ids[:, 6] & 0x0f | 0x40
+    ids[:, 8] = ids[:, 8] & 0x3f | 0x80
+    return ids
+
+
+def random_order_columns(
+    number: int,
+    generator: np.random.Generator,
+    price_range: tuple[float, float] = (0.1, 100),
+    quantity_range: tuple[int, int] = (1, 500),
+    symbols: list[str] | None = None,
+) -> dict[str, np.ndarray]:
+    """Function draws sides, quantities, prices and ids of random orders
+    as arrays in one shot. Ids are random version 4 UUIDs, returned as
+    rows of 16 bytes. If list of symbols is set, instrument of each
+    order is drawn from it."""
+    columns = {
+        'order_id': random_ids(number, generator),
+        'order_type': ORDER_TYPE_NAMES[generator.integers(0, 2, number)],
+        'quantity': generator.integers(
+            quantity_range[0], quantity_range[1] + 1, number),
+        'price': np.round(generator.uniform(*price_range, number), 2),
+    }
+    if symbols:
+        columns['symbol'] = np.array(symbols)[
+            generator.integers(0, len(symbols), number)]
+    return columns
+
+
+def columns_to_orders(
+    columns: dict[str, np.ndarray],
+    timestamp: float | None = None,
+    ttl: float | None = None,
+) -> list[Order]:
+    """Function builds list of orders from arrays of order fields.
+    Columns are generated valid by construction, so orders are created
+    with `Order.trusted` without validation. Timestamp of each
+    order is taken from `timestamp` column, if it is set, or else all
+    orders get the same timestamp. If time to live is set, orders are
+    GTT orders, which expire after it."""
+    timestamps = (columns['timestamp'].tolist() if 'timestamp' in columns
+                  else repeat(timestamp or time()))
+    time_in_force = 'GTC' if ttl is None else 'GTT'
+    ids = columns['order_id'].tobytes()
+    symbols = (columns['symbol'].tolist() if 'symbol' in columns
+               else repeat(DEFAULT_SYMBOL))
+    return [
+        Order.trusted(
+            UUID(bytes=ids[start:start + 16]), timestamp, order_type,
+            quantity, price, symbol, time_in_force,
+            None if ttl is None else timestamp + ttl,
+        )
+        for start, timestamp, order_type, quantity, price, symbol in zip(
+            range(0, len(ids), 16),
+            timestamps,
+            columns['order_type'].tolist(),
+            columns['quantity'].tolist(),
+            columns['price'].tolist(),
+            symbols,
+        )
+    ]
+
+
+def stream_random_orders(
+    batch_size: int,
+    seed: int | None = None,
+    batches: int | None = None,
+    ttl: float | None = None,
+    **kwargs,
+) -> Iterator[list[Order]]:
+    """Generator yields batches of random orders drawn from seeded NumPy
+    generator. Generation is endless, unless number of batches is set.
+    If time to live is set, orders expire after it. Keyword arguments
+    are passed to `random_order_columns`."""
+    generator = np.random.default_rng(seed)
+    batch = 0
+    while batches is None or batch < batches:
+        batch += 1
+        yield columns_to_orders(
+            random_order_columns(batch_size, generator, **kwargs), ttl=ttl)
@@ -0,0 +1,196 @@
+"""Replay of recorded order flow through order book. Flow is read from
+CSV file or from columnar binary `.npy` file in chunks, so memory does
+not depend on length of the flow. Sweeps replay the flow with several
+sets of parameters in parallel across process pool. Orders are matched
+on arrival, so matching engine is not a parameter of replay: batch
+matching of `VectorizedOrderBook` is not used by continuous flow.
+
+Usage:
+    python -m orderflow.replay flow.npy --backends simple price_level
+"""
+import argparse
+import csv
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import Iterable, Iterator
+from uuid import UUID
+
+from domain.models import Order, OrderBook, validate_orders
+from domain.snapshot import iter_snapshot, load_snapshot, save_snapshot
+from repository.repository import (PriceLevelOrderRepository,
+                                   SimpleOrderRepository)
+from repository.sqlite_repository import SQLiteOrderRepository
+
+FLOW_FIELDS = ('order_id', 'timestamp', 'order_type', 'quantity', 'price',
+               'time_in_force', 'expires_at')
+
+BACKENDS = {
+    'simple': SimpleOrderRepository,
+    'price_level': PriceLevelOrderRepository,
+    'sqlite': SQLiteOrderRepository,
+}
+
+
+def write_flow(path: str, orders: Iterable[Order]) -> int:
+    """Function records order flow to CSV file or, if path ends with
+    `.npy`, to columnar binary file in snapshot format, and returns
+    number of orders."""
+    if path.endswith('.npy'):
+        return save_snapshot(path, orders)
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(FLOW_FIELDS)
+        number = 0
+        for order in orders:
+            writer.writerow(
+                '' if value is None else value
+                for value in (getattr(order, name) for name in FLOW_FIELDS))
+            number += 1
+    return number
+
+
+def iter_flow(path: str, chunk_size: int = 10_000) -> Iterator[list[Order]]:
+    """Generator yields chunks of orders of recorded flow. Rows of CSV
+    file are validated chunk by chunk in one pass. Columnar file is
+    mapped into memory and is trusted, as it is written by
+    `write_flow`."""
+    if path.endswith('.npy'):
+        return _iter_flow_npy(path, chunk_size)
+    return _iter_flow_csv(path, chunk_size)
+
+
+def _iter_flow_csv(path: str, chunk_size: int) -> Iterator[list[Order]]:
+    """Generator yields validated chunks of orders of CSV file."""
+    with open(path, newline='') as file:
+        chunk = []
+        for row in csv.DictReader(file):
+            chunk.append({name: value for name, value in row.items()
+                          if value})
+            if len(chunk) == chunk_size:
+                yield validate_orders(chunk)
+                chunk = []
+        if chunk:
+            yield validate_orders(chunk)
+
+
+def _iter_flow_npy(path: str, chunk_size: int) -> Iterator[list[Order]]:
+    """Generator yields chunks of orders of columnar file."""
+    array = load_snapshot(path)
+    for start in range(0, len(array), chunk_size):
+        yield [
+            Order.trusted(
+                UUID(bytes=order_id), timestamp, order_type, quantity, price,
+                time_in_force=time_in_force, expires_at=expires_at)
+            for order_id, order_type, price, quantity, timestamp,
+            time_in_force, expires_at in iter_snapshot(
+                array[start:start + chunk_size])
+        ]
+
+
+def snap_to_tick(order: Order, tick_size: float) -> Order:
+    """Function returns order with price rounded to the nearest multiple
+    of tick size, but not less than one tick."""
+    price = round(max(1, round(order.price / tick_size)) * tick_size, 10)
+    if price == order.price:
+        return order
+    return order.model_copy(update={'price': price})
+
+
+def replay(
+    path: str,
+    order_book: OrderBook,
+    chunk_size: int = 10_000,
+    tick_size: float | None = None,
+) -> dict:
+    """Function matches orders of recorded flow on arrival as fast as
+    possible and returns statistics of the replay. Clock of the order
+    book follows timestamps of the flow, so orders expire in flow
+    time. If tick size is set, prices of the flow are snapped to it,
+    so flow recorded with finer tick can be replayed."""
+    stats = {'orders': 0, 'orders_matched': 0, 'orders_partial': 0}
+    now = [0.0]
+    order_book.clock = lambda: now[0]
+    start = time.perf_counter()
+    for chunk in iter_flow(path, chunk_size):
+        if tick_size:
+            chunk = [snap_to_tick(order, tick_size) for order in chunk]
+        for order in chunk:
+            now[0] = order.timestamp
+            matched, partial = order_book.add_and_match(order)
+            stats['orders_matched'] += len(matched)
+            stats['orders_partial'] += len(partial)
+        order_book.commit()
+        stats['orders'] += len(chunk)
+    stats['orders_resting'] = len(order_book.orders)
+    stats['elapsed_sec'] = time.perf_counter() - start
+    stats['orders_per_sec'] = stats['orders'] / max(
+        stats['elapsed_sec'], 1e-9)
+    return stats
+
+
+def run_scenario(scenario: dict) -> dict:
+    """Function replays flow of the scenario through order book built
+    from its parameters: `path`, `backend`, `tick_size` and
+    `chunk_size`, and returns parameters with statistics of the
+    replay. Tick size is set only for price level backend."""
+    repository_class = BACKENDS[scenario.get('backend', 'price_level')]
+    tick_size = scenario.get('tick_size')
+    repository = (repository_class(tick_size) if tick_size
+                  else repository_class())
+    return {**scenario, **replay(scenario['path'], OrderBook(repository),
+                                 scenario.get('chunk_size', 10_000),
+                                 tick_size)}
+
+
+def sweep(scenarios: list[dict], workers: int | None = None) -> dict:
+    """Function runs scenarios in parallel across process pool and
+    returns results of each scenario with aggregate statistics."""
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers) as executor:
+        results = list(executor.map(run_scenario, scenarios))
+    elapsed = time.perf_counter() - start
+    orders = sum(result['orders'] for result in results)
+    return {
+        'scenarios': results,
+        'orders': orders,
+        'elapsed_sec': elapsed,
+        'orders_per_sec': orders / max(elapsed, 1e-9),
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Function parses command line arguments."""
+    parser = argparse.ArgumentParser(description='Order flow replay')
+    parser.add_argument('paths', nargs='+',
+                        help='recorded flow files, CSV or .npy')
+    parser.add_argument('--backends', nargs='+', default=['price_level'],
+                        choices=sorted(BACKENDS))
+    parser.add_argument('--tick-sizes', nargs='+', type=float,
+                        help='tick sizes of price level backend. Prices '
+                             'of the flow are snapped to each of them')
+    parser.add_argument('--chunk-size', type=int, default=10_000)
+    parser.add_argument('--workers', type=int, default=None)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    scenarios = []
+    for path, backend in product(args.paths, args.backends):
+        scenario = {'path': path, 'backend': backend,
+                    'chunk_size': args.chunk_size}
+        if backend == 'price_level' and args.tick_sizes:
+            scenarios.extend({**scenario, 'tick_size': tick_size}
+                             for tick_size in args.tick_sizes)
+        else:
+            scenarios.append(scenario)
+    result = sweep(scenarios, args.workers)
+    for scenario in result.pop('scenarios'):
+        print(json.dumps(scenario))
+    print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
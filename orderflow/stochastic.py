@@ -0,0 +1,173 @@
+from time import time
+from typing import Iterator, NamedTuple
+
+import numpy as np
+
+from domain.models import Order
+from orderflow.generators import (ORDER_TYPE_NAMES, columns_to_orders,
+                                  random_ids)
+
+
+class FlowBatch(NamedTuple):
+    """Batch of order flow: new orders and earlier orders, which are
+    cancelled."""
+
+    orders: list[Order]
+    cancels: list[Order]
+
+
+def poisson_arrivals(
+    number: int,
+    generator: np.random.Generator,
+    rate: float,
+    start: float,
+) -> np.ndarray:
+    """Function returns arrival times of the specified number of orders
+    of Poisson process with the rate in orders per second."""
+    return start + np.cumsum(generator.exponential(1 / rate, number))
+
+
+def random_walk_mid(
+    times: np.ndarray,
+    generator: np.random.Generator,
+    mid_price: float,
+    start: float,
+    volatility: float,
+) -> np.ndarray:
+    """Function returns mid price at each of the times. Mid follows
+    geometric random walk with the volatility per square root of second,
+    so it drifts but stays positive."""
+    steps = (np.sqrt(np.diff(times, prepend=start))
+             * generator.standard_normal(len(times)))
+    return mid_price * np.exp(volatility * np.cumsum(steps))
+
+
+def pareto_sizes(
+    number: int,
+    generator: np.random.Generator,
+    alpha: float,
+    min_size: int,
+    max_size: int,
+) -> np.ndarray:
+    """Function returns heavy-tailed order sizes: Pareto distributed
+    with the shape `alpha`, scaled by minimum size and capped by
+    maximum size."""
+    sizes = np.floor(min_size * (1 + generator.pareto(alpha, number)))
+    return np.minimum(sizes, max_size).astype(np.int64)
+
+
+class StochasticOrderFlow:
+    """Seeded generator of realistic order flow. Orders arrive as Poisson
+    process, their prices cluster around mid price, which follows
+    random walk, and their sizes are heavy-tailed. Passive orders rest
+    on their side of the mid at exponentially distributed distance,
+    aggressive orders cross the mid by the same distance. Mean number
+    of cancellations per new order is set by `cancel_ratio`, number of
+    cancellations of a batch is Poisson distributed: cancelled
+    orders are drawn from the last `cancel_window` orders of the flow,
+    whether they still rest in the book or not. If time to live is set,
+    orders are GTT orders, which expire after it in time of the flow.
+    Each part of the model
+    is a method working on whole batch of arrays, so a part can be
+    replaced by subclass."""
+
+    def __init__(
+        self,
+        seed: int | None = None,
+        arrival_rate: float = 1000.0,
+        mid_price: float = 50.0,
+        volatility: float = 0.01,
+        spread: float = 0.002,
+        aggressive_ratio: float = 0.3,
+        size_alpha: float = 1.5,
+        min_size: int = 1,
+        max_size: int = 10_000,
+        cancel_ratio: float = 0.0,
+        cancel_window: int = 10_000,
+        tick_size: float = 0.01,
+        start_time: float | None = None,
+        ttl: float | None = None,
+    ):
+        if cancel_ratio < 0:
+            raise ValueError('Cancel ratio must not be negative')
+        self.generator = np.random.default_rng(seed)
+        self.arrival_rate = arrival_rate
+        self.mid_price = mid_price
+        self.volatility = volatility
+        self.spread = spread
+        self.aggressive_ratio = aggressive_ratio
+        self.size_alpha = size_alpha
+        self.min_size = min_size
+        self.max_size = max_size
+        self.cancel_ratio = cancel_ratio
+        self.cancel_window = cancel_window
+        self.tick_size = tick_size
+        self.time = start_time or time()
+        self.ttl = ttl
+        self._cancellable = []
+
+    def columns(self, number: int) -> dict[str, np.ndarray]:
+        """Method draws fields of the next orders of the flow as arrays
+        and moves time and mid price of the flow forward."""
+        generator = self.generator
+        times = poisson_arrivals(
+            number, generator, self.arrival_rate, self.time)
+        mids = random_walk_mid(
+            times, generator, self.mid_price, self.time, self.volatility)
+        self.time = float(times[-1])
+        self.mid_price = float(mids[-1])
+        sides = generator.integers(0, 2, number)
+        return {
+            'order_id': random_ids(number, generator),
+            'timestamp': times,
+            'order_type': ORDER_TYPE_NAMES[sides],
+            'quantity': pareto_sizes(
+                number, generator, self.size_alpha, self.min_size,
+                self.max_size),
+            'price': self.prices(mids, sides),
+        }
+
+    def prices(self, mids: np.ndarray, sides: np.ndarray) -> np.ndarray:
+        """Method returns limit prices of orders, rounded to ticks."""
+        generator = self.generator
+        offsets = generator.exponential(self.spread, len(mids))
+        aggressive = generator.random(len(mids)) < self.aggressive_ratio
+        directions = np.where((sides == 1) == aggressive, 1, -1)
+        ticks = np.round(mids * (1 + directions * offsets) / self.tick_size)
+        return np.round(np.maximum(ticks, 1) * self.tick_size, 10)
+
+    def cancels(self, number: int) -> list[Order]:
+        """Method draws orders to cancel among recent orders of the
+        flow. Each order is cancelled at most once."""
+        cancellable = self._cancellable
+        number = min(len(cancellable),
+                     self.generator.poisson(number * self.cancel_ratio))
+        selected = self.generator.choice(
+            len(cancellable), number, replace=False)
+        cancels = []
+        for idx in sorted(selected.tolist(), reverse=True):
+            cancellable[idx], cancellable[-1] = (
+                cancellable[-1], cancellable[idx])
+            cancels.append(cancellable.pop())
+        return cancels
+
+    def next_batch(self, number: int) -> FlowBatch:
+        """Method returns the next batch of the flow."""
+        orders = columns_to_orders(self.columns(number), ttl=self.ttl)
+        cancels = self.cancels(number) if self.cancel_ratio else []
+        if self.cancel_ratio:
+            self._cancellable.extend(orders)
+            del self._cancellable[:-self.cancel_window]
+        return FlowBatch(orders, cancels)
+
+    def stream(
+        self,
+        batch_size: int,
+        batches: int | None = None,
+    ) -> Iterator[FlowBatch]:
+        """Generator yields batches of the flow. Generation is endless,
+        unless number of batches is set."""
+        batch = 0
+        while batches is None or batch < batches:
+            batch += 1
+            yield self.next_batch(batch_size)
@@ -0,0 +1,135 @@
+from bisect import bisect_left, bisect_right, insort
+from heapq import merge
+from operator import attrgetter
+from typing import Iterator
+
+
+class HashIndex:
+    """Secondary index of orders by value of one field. Orders with equal
+    value are kept in a bucket, which is a dict keyed by integer value of
+    order id, so orders of a bucket keep order of their arrival. Indexed
+    value of each order is kept by index, so the order is found in its
+    bucket even if the model has been changed in place."""
+
+    def __init__(self, field: str):
+        self.field = field
+        self.buckets = {}
+        self._values = {}
+
+    def add(self, key: int, order) -> None:
+        """Method puts order at the end of bucket of its value."""
+        value = self._value(order)
+        bucket = self.buckets.get(value)
+        if bucket is None:
+            bucket = self.buckets[value] = {}
+            self._add_value(value)
+        bucket[key] = order
+        self._values[key] = value
+
+    def update(self, key: int, order) -> None:
+        """Method replaces order in its bucket. Order keeps its place in
+        the bucket, unless its value has changed."""
+        value = self._value(order)
+        if self._values[key] == value:
+            self.buckets[value][key] = order
+            return
+        self.remove(key)
+        self.add(key, order)
+
+    def remove(self, key: int) -> None:
+        """Method removes order from its bucket and drops the bucket
+        when it becomes empty."""
+        value = self._values.pop(key)
+        bucket = self.buckets[value]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[value]
+            self._remove_value(value)
+
+    def get(self, value) -> dict:
+        """Method returns bucket of the value."""
+        return self.buckets.get(value, {})
+
+    def _value(self, order):
+        """Method returns value the order is indexed by."""
+        return getattr(order, self.field)
+
+    def _add_value(self, value) -> None:
+        pass
+
+    def _remove_value(self, value) -> None:
+        pass
+
+
+class SortedIndex(HashIndex):
+    """Secondary index, which also keeps sorted list of distinct values
+    of the field, so orders are iterated in order of the value and
+    ranges of values are found with bisect. Index can be partitioned by
+    another field, e.g. by side of orders. Each partition keeps its own
+    sorted list, so orders of one partition are iterated without
+    skipping orders of others, and buckets are keyed by pair of
+    partition value and value."""
+
+    def __init__(self, field: str, partition: str | None = None):
+        super().__init__(field)
+        self.partition = partition
+        self.sorted_values = {}
+
+    def get(self, value) -> dict:
+        """Method returns orders with the value from all partitions."""
+        orders = {}
+        for partition_value in self.sorted_values:
+            orders.update(self.buckets.get((partition_value, value), {}))
+        return orders
+
+    def iter_range(
+        self,
+        lower=None,
+        upper=None,
+        reverse_sorting: bool = False,
+        partition_value=None,
+    ) -> Iterator:
+        """Method returns iterator over orders with value between `lower`
+        and `upper` inclusive, bucket by bucket. Missing bound is not
+        checked. Orders of one bucket are yielded in order of their
+        arrival in both directions of sorting. If partition value is not
+        set, orders of all partitions are merged."""
+        if partition_value is not None or self.partition is None:
+            return self._iter_partition(
+                partition_value, lower, upper, reverse_sorting)
+        return merge(
+            *(self._iter_partition(value, lower, upper, reverse_sorting)
+              for value in list(self.sorted_values)),
+            key=attrgetter(self.field),
+            reverse=reverse_sorting)
+
+    def _iter_partition(
+        self,
+        partition_value,
+        lower,
+        upper,
+        reverse_sorting: bool,
+    ) -> Iterator:
+        """Generator yields orders of one partition in the range."""
+        values = self.sorted_values.get(partition_value, [])
+        start = 0 if lower is None else bisect_left(values, lower)
+        end = len(values) if upper is None else bisect_right(values, upper)
+        selected = range(start, end)
+        for idx in (reversed(selected) if reverse_sorting else selected):
+            yield from self.buckets[partition_value, values[idx]].values()
+
+    def _value(self, order):
+        partition_value = (None if self.partition is None
+                           else getattr(order, self.partition))
+        return partition_value, getattr(order, self.field)
+
+    def _add_value(self, value) -> None:
+        partition_value, value = value
+        insort(self.sorted_values.setdefault(partition_value, []), value)
+
+    def _remove_value(self, value) -> None:
+        partition_value, value = value
+        values = self.sorted_values[partition_value]
+        del values[bisect_left(values, value)]
+        if not values:
+            del self.sorted_values[partition_value]
@@ -0,0 +1,187 @@
+import math
+import os
+import struct
+from typing import Iterator
+from uuid import UUID
+
+from domain.models import (DEFAULT_SYMBOL, ORDER_TYPES, SIDES,
+                           TIME_IN_FORCE, Order, OrderRecord)
+
+MAGIC = b'OJRNL002'
+EVENT = struct.Struct('<B16sBBdqdd')
+ADD = 1
+MODIFY = 2
+REMOVE = 3
+BATCH_REMOVE = 4
+FILL = 5
+RESIDUAL = 6
+COMMIT = 7
+EMPTY_ID = bytes(16)
+
+
+class OrderJournal:
+    """Append-only binary journal of order book mutations. Events are
+    buffered in memory and written to file by `commit`, which is called
+    once per round, so the file is synced once per group of events
+    rather than once per order. Each group ends with commit marker, and
+    groups without marker are ignored on replay. Events after the last
+    commit marker, which are left by a crash, are cut off when the
+    journal is opened, so they are not adopted by the next commit.
+    Journal keeps changes of one order book, so instrument of orders is
+    not recorded. File starts with magic bytes of the format version,
+    and file of unknown format is rejected."""
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, 'r+b') as file:
+                data = file.read()
+                check_magic(path, data)
+                file.truncate(
+                    len(MAGIC) + committed_size(data[len(MAGIC):]))
+            self._file = open(path, 'ab')
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(MAGIC)
+            self._file.flush()
+        self._buffer = bytearray()
+
+    def append(self, event: int, order: Order | OrderRecord) -> None:
+        """Method buffers event of the order."""
+        self._buffer += EVENT.pack(
+            event, order.order_id.bytes, SIDES[order.order_type],
+            TIME_IN_FORCE.index(order.time_in_force), order.price,
+            order.quantity, order.timestamp,
+            math.nan if order.expires_at is None else order.expires_at)
+
+    def extend(self, event: int, orders: list[Order | OrderRecord]) -> None:
+        """Method buffers event of each order of the list."""
+        for order in orders:
+            self.append(event, order)
+
+    def add(self, order: Order | OrderRecord) -> None:
+        """Method records adding of the order."""
+        self.append(ADD, order)
+
+    def modify(self, order: Order | OrderRecord) -> None:
+        """Method records update of the order."""
+        self.append(MODIFY, order)
+
+    def remove(self, order: Order | OrderRecord) -> None:
+        """Method records removal of the order."""
+        self.append(REMOVE, order)
+
+    def batch_remove(self, orders: list[Order | OrderRecord]) -> None:
+        """Method records removal of list of orders."""
+        self.extend(BATCH_REMOVE, orders)
+
+    def match(
+        self,
+        removed: list[Order | OrderRecord],
+        updated: list[Order | OrderRecord],
+    ) -> None:
+        """Method records result of matching: fully matched orders and
+        unmatched parts of partially matched orders."""
+        self.extend(FILL, removed)
+        self.extend(RESIDUAL, updated)
+
+    def commit(self) -> None:
+        """Method writes buffered events with commit marker to file
+        and syncs it to disk."""
+        if not self._buffer:
+            return
+        self._buffer += EVENT.pack(COMMIT, EMPTY_ID, 0, 0, 0, 0, 0, 0)
+        self._file.write(self._buffer)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._buffer.clear()
+
+    def close(self) -> None:
+        """Method commits buffered events and closes the journal."""
+        self.commit()
+        self._file.close()
+
+
+def check_magic(path: str, data: bytes) -> None:
+    """Function checks that journal data starts with magic bytes of the
+    current format."""
+    if not data.startswith(MAGIC):
+        raise ValueError(f'{path} is not an order journal file of '
+                         f'version {MAGIC.decode()}')
+
+
+def committed_size(data: bytes) -> int:
+    """Function returns size of the part of journal events, which ends
+    with the last commit marker."""
+    for offset in range(len(data) // EVENT.size * EVENT.size - EVENT.size,
+                        -1, -EVENT.size):
+        if data[offset] == COMMIT:
+            return offset + EVENT.size
+    return 0
+
+
+def read_journal(
+    path: str,
+    symbol: str = DEFAULT_SYMBOL,
+) -> Iterator[list[tuple[int, OrderRecord]]]:
+    """Generator yields committed groups of events of the journal.
+    Events are read straight into order records of the specified
+    instrument, without validation."""
+    with open(path, 'rb') as file:
+        data = file.read()
+    if not data:
+        return
+    check_magic(path, data)
+    data = data[len(MAGIC):]
+    data = data[:len(data) - len(data) % EVENT.size]
+    group = []
+    for (event, order_id, side, time_in_force, price, quantity, timestamp,
+         expires_at) in EVENT.iter_unpack(data):
+        if event == COMMIT:
+            yield group
+            group = []
+            continue
+        group.append((event, OrderRecord(
+            UUID(bytes=order_id), timestamp, ORDER_TYPES[side],
+            quantity, price, symbol, TIME_IN_FORCE[time_in_force],
+            None if math.isnan(expires_at) else expires_at)))
+
+
+def replay_journal(
+    path: str,
+    order_book,
+    symbol: str = DEFAULT_SYMBOL,
+):
+    """Function applies committed events of the journal to repository
+    of the order book and returns the order book. Matching is not run
+    again, as its results are recorded in the journal. Expiry of the
+    resting orders is scheduled again."""
+    repository = order_book.orders
+    for group in read_journal(path, symbol):
+        removed = []
+        updated = []
+        for event, record in group:
+            if event in (FILL, BATCH_REMOVE):
+                if updated:
+                    repository.apply_changes(removed, updated)
+                    removed, updated = [], []
+                removed.append(record)
+                continue
+            if event == RESIDUAL:
+                updated.append(record)
+                continue
+            if removed or updated:
+                repository.apply_changes(removed, updated)
+                removed, updated = [], []
+            if event == ADD:
+                repository.add(record)
+            elif event == MODIFY:
+                repository.update(record)
+            elif event == REMOVE:
+                repository.remove(record)
+        if removed or updated:
+            repository.apply_changes(removed, updated)
+    order_book.rebuild_expiry()
+    return order_book
@@ -0,0 +1,164 @@
+import math
+import mmap
+import os
+import struct
+from uuid import UUID
+
+from domain.models import (DEFAULT_SYMBOL, ORDER_TYPES, SIDES,
+                           TIME_IN_FORCE, Order, OrderRecord)
+from repository.repository import PriceLevelOrderRepository
+
+HEADER = struct.Struct('<8sQ')
+MAGIC = b'OBOOK002'
+RECORD = struct.Struct('<BBB5x16sdqddQ')
+
+
+class MmapOrderRepository(PriceLevelOrderRepository):
+    """Repository keeps price levels in memory and persists orders in
+    a memory-mapped file of fixed-width binary records. Each record
+    holds used flag, side, time in force, order id, price, quantity,
+    timestamp, expiry time and sequence number of the order, which keeps
+    FIFO order of price levels across restarts. Slots of removed orders
+    are reused through free list. Reopening the file rebuilds price
+    levels straight from the records, without validation of orders. File
+    keeps orders of one instrument, which is set by `symbol`. Changes
+    are flushed to disk by `commit` once per round."""
+
+    def __init__(
+        self,
+        path: str,
+        capacity: int = 1024,
+        symbol: str = DEFAULT_SYMBOL,
+        tick_size: float = 0.01,
+    ):
+        super().__init__(tick_size)
+        self.path = path
+        self.symbol = symbol
+        self._slots = {}
+        self._free_slots = []
+        is_new = not os.path.exists(path) or not os.path.getsize(path)
+        self._file = open(path, 'w+b' if is_new else 'r+b')
+        if is_new:
+            self._file.write(HEADER.pack(MAGIC, 0))
+            self._file.truncate(self._file_size(capacity))
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        magic, self._sequence = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f'{path} is not an order book file')
+        self._capacity = (len(self._mmap) - HEADER.size) // RECORD.size
+        self._load()
+
+    def flush(self) -> None:
+        """Method flushes changes of the file to disk."""
+        HEADER.pack_into(self._mmap, 0, MAGIC, self._sequence)
+        self._mmap.flush()
+
+    def _commit(self) -> None:
+        """Method flushes changes of the round to disk, so a committed
+        round survives crash of the system."""
+        self.flush()
+
+    def close(self) -> None:
+        """Method flushes changes and closes the file."""
+        if not self._mmap.closed:
+            self.flush()
+            self._mmap.close()
+        self._file.close()
+
+    def _add(self, order: Order | OrderRecord) -> None:
+        """Method to add order into repository."""
+        super()._add(order)
+        key = order.order_id.int
+        self._write(key, self._allocate(key))
+
+    def _update(self, order: Order | OrderRecord) -> None:
+        """Method to update order in repository."""
+        super()._update(order)
+        key = order.order_id.int
+        self._write(key, self._slots[key])
+
+    def _remove(self, order: Order | OrderRecord) -> None:
+        """Method to remove order from repository."""
+        super()._remove(order)
+        self._release(order.order_id.int)
+
+    def _batch_remove(self, orders: list[Order | OrderRecord]) -> None:
+        """Method to remove list of orders from repository."""
+        for order in orders:
+            if order.order_id.int in self.orders:
+                self._remove(order)
+
+    def _load(self) -> None:
+        """Method rebuilds price levels from used records of the file
+        in order of their sequence numbers."""
+        used_records = []
+        view = memoryview(self._mmap)[
+            HEADER.size:HEADER.size + self._capacity * RECORD.size]
+        for slot, fields in enumerate(RECORD.iter_unpack(view)):
+            if fields[0]:
+                used_records.append((fields[-1], slot, fields))
+            else:
+                self._free_slots.append(slot)
+        view.release()
+        self._free_slots.reverse()
+        used_records.sort()
+        for sequence, slot, fields in used_records:
+            (_, side, time_in_force, order_id, price, quantity, timestamp,
+             expires_at, _) = fields
+            record = OrderRecord(
+                UUID(bytes=order_id), timestamp, ORDER_TYPES[side],
+                quantity, price, self.symbol, TIME_IN_FORCE[time_in_force],
+                None if math.isnan(expires_at) else expires_at)
+            record.ticks = self._to_ticks(price)
+            record.sequence = sequence
+            key = record.order_id.int
+            self.orders[key] = record
+            self._add_to_level(key, record)
+            self._slots[key] = slot
+            self._sequence = max(self._sequence, sequence)
+
+    def _allocate(self, key: int) -> int:
+        """Method returns free slot for the order, growing the file
+        if there is no free slot."""
+        if not self._free_slots:
+            self._grow()
+        slot = self._free_slots.pop()
+        self._slots[key] = slot
+        return slot
+
+    def _release(self, key: int) -> None:
+        """Method marks slot of removed order as free."""
+        slot = self._slots.pop(key)
+        self._mmap[self._offset(slot)] = 0
+        self._free_slots.append(slot)
+
+    def _write(self, key: int, slot: int) -> None:
+        """Method writes record of the order into its slot."""
+        record = self.orders[key]
+        RECORD.pack_into(
+            self._mmap, self._offset(slot), 1, SIDES[record.order_type],
+            TIME_IN_FORCE.index(record.time_in_force),
+            record.order_id.bytes, record.price, record.quantity,
+            record.timestamp,
+            math.nan if record.expires_at is None else record.expires_at,
+            record.sequence)
+
+    def _grow(self) -> None:
+        """Method doubles capacity of the file."""
+        new_capacity = max(1, self._capacity * 2)
+        self.flush()
+        self._mmap.close()
+        self._file.truncate(self._file_size(new_capacity))
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        self._free_slots.extend(
+            reversed(range(self._capacity, new_capacity)))
+        self._capacity = new_capacity
+
+    @staticmethod
+    def _offset(slot: int) -> int:
+        return HEADER.size + slot * RECORD.size
+
+    @staticmethod
+    def _file_size(capacity: int) -> int:
+        return HEADER.size + capacity * RECORD.size
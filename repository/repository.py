@@ -1,6 +1,10 @@
 import abc
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Set
+from typing import Iterator
 
-from domain.models import Order
+from domain.models import Order, OrderRecord, as_order
+from repository.indexes import HashIndex, SortedIndex
 
 
 class RepAlreadyExistsError(Exception):
@@ -11,6 +15,10 @@ class RepNotFoundError(Exception):
     pass
 
 
+class RepInvalidPriceError(Exception):
+    pass
+
+
 class AbstractOrderRepository(abc.ABC):
     """Abstract repository class for Orders."""
 
@@ -18,6 +26,12 @@ class AbstractOrderRepository(abc.ABC):
         """Method to add order into repository."""
         self._add(order)
 
+    def check_add(self, order: Order) -> None:
+        """Method checks that order can be added into repository and
+        raises the error `add` would raise, without changing
+        repository."""
+        self._check_add(order)
+
     def update(self, order: Order) -> None:
         """Method to update order in repository."""
         self._update(order)
@@ -33,6 +47,73 @@ class AbstractOrderRepository(abc.ABC):
         specified field value."""
         return self._get_by_field(field, value, sort_field, reverse_sorting)
 
+    def iter_by_field(
+        self,
+        field: str,
+        value,
+        sort_field: str | None = None,
+        reverse_sorting: bool = False,
+    ) -> Iterator[Order]:
+        """Method to lazily iterate over orders from repository, basing on
+        specified field value."""
+        return self._iter_by_field(field, value, sort_field, reverse_sorting)
+
+    def get_by_range(
+        self,
+        field: str,
+        lower=None,
+        upper=None,
+        reverse_sorting: bool = False,
+        **filters,
+    ) -> list[Order]:
+        """Method to get list of orders from repository with value of the
+        field between `lower` and `upper` inclusive, sorted by the field.
+        Missing bound is not checked. Keyword arguments are equality
+        filters, e.g. `order_type='buy'`."""
+        return list(self._iter_by_range(
+            field, lower, upper, reverse_sorting, filters))
+
+    def iter_by_range(
+        self,
+        field: str,
+        lower=None,
+        upper=None,
+        reverse_sorting: bool = False,
+        **filters,
+    ) -> Iterator[Order]:
+        """Method to lazily iterate over orders from repository with value
+        of the field between `lower` and `upper` inclusive, sorted by
+        the field."""
+        return self._iter_by_range(
+            field, lower, upper, reverse_sorting, filters)
+
+    def iter_records(self, order_type: str) -> Iterator:
+        """Method to lazily iterate over orders of the specified side in
+        price priority. Items are internal records of repository, which
+        are accepted back by `update` and `batch_remove`."""
+        return self._iter_records(order_type)
+
+    def get_depth(
+        self,
+        order_type: str,
+        levels: int | None = None,
+    ) -> list[tuple[float, int]]:
+        """Method to get aggregated depth of the specified side: list of
+        price levels with total quantity of each, best level first.
+        If number of levels is set, only the best levels are returned."""
+        return self._get_depth(order_type, levels)
+
+    def pop_depth_changes(self) -> dict[str, dict[float, int]]:
+        """Method to get price levels of each side, which have changed
+        since the previous call, with their new total quantity. Level,
+        which has been emptied, has zero quantity."""
+        return self._pop_depth_changes()
+
+    def get_best(self, order_type: str) -> Order | None:
+        """Method to get the best priced order of the specified side:
+        the highest buy or the lowest sell."""
+        return self._get_best(order_type)
+
     def remove(self, order: Order) -> None:
         """Method to remove order from repository."""
         self._remove(order)
@@ -41,10 +122,39 @@ class AbstractOrderRepository(abc.ABC):
         """Method to remove order from repository."""
         self._batch_remove(orders)
 
+    def apply_changes(
+        self,
+        removed: list[Order],
+        updated: list[Order],
+    ) -> None:
+        """Method to apply fills and residual updates of a matching round
+        as one transaction: either all changes are applied, or, if some
+        updated order is not found, none of them."""
+        self._apply_changes(removed, updated)
+
+    def commit(self) -> None:
+        """Method makes changes made since the previous commit durable,
+        e.g. at the end of a round."""
+        self._commit()
+
+    def count(self, order_type: str | None = None) -> int:
+        """Method to get number of orders of the specified side, or
+        of all orders, if side is not specified."""
+        return self._count(order_type)
+
+    def __len__(self) -> int:
+        return self._count()
+
     def _add(self, order: Order) -> None:
         """Method to add order into repository."""
         raise NotImplementedError
 
+    def _check_add(self, order: Order) -> None:
+        """Method to check that order can be added. By default order id
+        is looked up with `_iter_by_field`."""
+        if next(self._iter_by_field('order_id', order.order_id), None):
+            raise RepAlreadyExistsError('Order is already in repository')
+
     def _update(self, order: Order) -> None:
         """Method to update order in repository."""
         raise NotImplementedError
@@ -60,6 +170,95 @@ class AbstractOrderRepository(abc.ABC):
         specified field value."""
         raise NotImplementedError
 
+    def _iter_by_field(
+        self,
+        field: str,
+        value,
+        sort_field: str | None = None,
+        reverse_sorting: bool = False,
+    ) -> Iterator[Order]:
+        """Method to lazily iterate over orders from repository. By default
+        iterates over the result of `_get_by_field`."""
+        return iter(self._get_by_field(
+            field, value, sort_field, reverse_sorting))
+
+    def _iter_by_range(
+        self,
+        field: str,
+        lower,
+        upper,
+        reverse_sorting: bool,
+        filters: dict,
+    ) -> Iterator[Order]:
+        """Method to lazily iterate over orders with value of the field
+        in the range. By default orders of both sides are read with
+        `_iter_by_field` and filtered."""
+        results = []
+        for order_type in ('sell', 'buy'):
+            if filters.get('order_type', order_type) != order_type:
+                continue
+            results.extend(
+                item for item in self._iter_by_field(
+                    'order_type', order_type, field, reverse_sorting)
+                if _in_range(item, field, lower, upper, filters))
+        results.sort(key=lambda item: getattr(item, field),
+                     reverse=reverse_sorting)
+        return iter(results)
+
+    def _iter_records(self, order_type: str) -> Iterator:
+        """Method to lazily iterate over orders of the specified side in
+        price priority. By default records are Order models themselves."""
+        return self._iter_by_field(
+            field='order_type',
+            value=order_type,
+            sort_field='price',
+            reverse_sorting=(order_type == 'buy'))
+
+    def _get_depth(
+        self,
+        order_type: str,
+        levels: int | None = None,
+    ) -> list[tuple[float, int]]:
+        """Method to get aggregated depth of the side. By default it is
+        aggregated from records of the side in price priority."""
+        depth = []
+        for record in self._iter_records(order_type):
+            if depth and depth[-1][0] == record.price:
+                depth[-1][1] += record.quantity
+                continue
+            if len(depth) == levels:
+                break
+            depth.append([record.price, record.quantity])
+        return [(price, quantity) for price, quantity in depth]
+
+    def _pop_depth_changes(self) -> dict[str, dict[float, int]]:
+        """Method to get changed price levels. By default whole depth is
+        aggregated and compared with depth of the previous call."""
+        previous = getattr(self, '_previous_depth', {'buy': {}, 'sell': {}})
+        current = {order_type: dict(self._get_depth(order_type))
+                   for order_type in ('buy', 'sell')}
+        self._previous_depth = current
+        return {
+            order_type: {
+                price: current[order_type].get(price, 0)
+                for price in (previous[order_type].keys()
+                              | current[order_type].keys())
+                if (previous[order_type].get(price)
+                    != current[order_type].get(price))
+            }
+            for order_type in ('buy', 'sell')
+        }
+
+    def _get_best(self, order_type: str) -> Order | None:
+        """Method to get the best priced order of the specified side."""
+        return next(
+            self._iter_by_field(
+                field='order_type',
+                value=order_type,
+                sort_field='price',
+                reverse_sorting=(order_type == 'buy')),
+            None)
+
     def _remove(self, order: Order) -> None:
         """Method to remove order from repository."""
         raise NotImplementedError
@@ -68,25 +267,110 @@ class AbstractOrderRepository(abc.ABC):
         """Method to remove order from repository."""
         raise NotImplementedError
 
+    def _apply_changes(
+        self,
+        removed: list[Order],
+        updated: list[Order],
+    ) -> None:
+        """Method to apply removals and updates. By default they are
+        applied one by one."""
+        self._batch_remove(removed)
+        for order in updated:
+            self._update(order)
+
+    def _commit(self) -> None:
+        """Method to make changes durable. By default changes are kept
+        only in memory and there is nothing to do."""
+        pass
+
+    def _count(self, order_type: str | None = None) -> int:
+        """Method to get number of orders in repository."""
+        raise NotImplementedError
+
+
+def _in_range(item, field: str, lower, upper, filters: dict) -> bool:
+    """Function checks that value of the field of the item is in the range
+    and the item passes equality filters."""
+    value = getattr(item, field)
+    if lower is not None and value < lower:
+        return False
+    if upper is not None and value > upper:
+        return False
+    return all(getattr(item, name) == filter_value
+               for name, filter_value in filters.items())
+
+
+class OrderSetView(Set):
+    """Read-only set-like view over orders stored in dict keyed by
+    integer value of order id."""
+
+    def __init__(self, orders: dict):
+        self._orders = orders
+
+    def __contains__(self, order) -> bool:
+        order_id = getattr(order, 'order_id', None)
+        return order_id is not None and order_id.int in self._orders
+
+    def __iter__(self) -> Iterator[Order]:
+        return iter(self._orders.values())
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
 
 class SimpleOrderRepository(AbstractOrderRepository):
+    """Repository keeps orders in dict keyed by integer value of order
+    id. `orders` attribute is a set-like view over stored orders.
+    Order records are turned into Order models when they are stored.
+    Secondary indexes are declared by `hash_indexes`, for fields queried
+    by equality, and by `sorted_indexes`, for fields used for sorting
+    and range queries. Sorted indexes are partitioned by side, so orders
+    of one side are read without skipping the other one. Indexes are
+    kept up to date on each change, and queries on fields without index
+    fall back to full scan. Total quantity of each price level of each
+    side and the set of changed levels are kept up to date as well, so
+    depth and its changes are read without aggregation."""
 
-    def __init__(self):
-        self.orders = set()
+    def __init__(
+        self,
+        hash_indexes: tuple[str, ...] = ('order_type',),
+        sorted_indexes: tuple[str, ...] = ('price',),
+    ):
+        self._orders = {}
+        self.orders = OrderSetView(self._orders)
+        self.indexes = {field: HashIndex(field) for field in hash_indexes}
+        self.indexes.update(
+            (field, SortedIndex(field, 'order_type'))
+            for field in sorted_indexes)
+        self._depth = {'buy': {}, 'sell': {}}
+        self._changed_levels = {'buy': set(), 'sell': set()}
 
     def _add(self, order: Order) -> None:
         """Method to add order into repository."""
-        if order in self.orders:
+        key = order.order_id.int
+        if key in self._orders:
+            raise RepAlreadyExistsError('Order is already in repository')
+        order = self._orders[key] = as_order(order)
+        for index in self.indexes.values():
+            index.add(key, order)
+        self._change_depth(order, order.quantity)
+
+    def _check_add(self, order: Order) -> None:
+        """Method to check that order can be added."""
+        if order.order_id.int in self._orders:
             raise RepAlreadyExistsError('Order is already in repository')
-        self.orders.add(order)
 
     def _update(self, order: Order) -> None:
         """Method to update order in repository."""
-        try:
-            self.orders.remove(order)
-        except Exception:
+        key = order.order_id.int
+        stored = self._orders.get(key)
+        if stored is None:
             raise RepNotFoundError('Order for update is not found')
-        self.orders.add(order)
+        order = self._orders[key] = as_order(order)
+        for index in self.indexes.values():
+            index.update(key, order)
+        self._change_depth(stored, -stored.quantity)
+        self._change_depth(order, order.quantity)
 
     def _get_by_field(
         self,
@@ -97,27 +381,420 @@ class SimpleOrderRepository(AbstractOrderRepository):
     ) -> list[Order]:
         """Method to get list of orders from repository, basing on
         specified field value."""
-        results = [item for item in self.orders
-                   if getattr(item, field) == value]
-        if not sort_field:
-            return results
+        return list(self._iter_by_field(
+            field, value, sort_field, reverse_sorting))
+
+    def _iter_by_field(
+        self,
+        field: str,
+        value,
+        sort_field: str | None = None,
+        reverse_sorting: bool = False,
+    ) -> Iterator[Order]:
+        """Method to lazily iterate over orders from repository. Orders
+        sorted by a field with sorted index are read from the index,
+        orders of a field with index are read from its bucket, other
+        queries scan all orders."""
+        if field == 'order_id' and not sort_field:
+            order = self._orders.get(value.int)
+            return iter([order] if order is not None else [])
+        sorted_index = self.indexes.get(sort_field)
+        if isinstance(sorted_index, SortedIndex):
+            if field == sort_field:
+                return iter(list(sorted_index.get(value).values()))
+            if field == sorted_index.partition:
+                return sorted_index.iter_range(
+                    reverse_sorting=reverse_sorting, partition_value=value)
+            return (item for item in sorted_index.iter_range(
+                reverse_sorting=reverse_sorting)
+                if getattr(item, field) == value)
+        index = self.indexes.get(field)
+        if index is not None:
+            results = list(index.get(value).values())
+        else:
+            results = [item for item in self._orders.values()
+                       if getattr(item, field) == value]
+        if sort_field:
+            self._sort(results, sort_field, reverse_sorting)
+        return iter(results)
+
+    def _iter_by_range(
+        self,
+        field: str,
+        lower,
+        upper,
+        reverse_sorting: bool,
+        filters: dict,
+    ) -> Iterator[Order]:
+        """Method to lazily iterate over orders with value of the field
+        in the range. Range of a field with sorted index is found by
+        bisect, other fields are scanned."""
+        index = self.indexes.get(field)
+        if isinstance(index, SortedIndex):
+            return (item for item in index.iter_range(
+                lower, upper, reverse_sorting,
+                filters.get(index.partition))
+                if all(getattr(item, name) == filter_value
+                       for name, filter_value in filters.items()))
+        results = [item for item in self._orders.values()
+                   if _in_range(item, field, lower, upper, filters)]
+        self._sort(results, field, reverse_sorting)
+        return iter(results)
+
+    def _remove(self, order: Order) -> None:
+        """Method to remove order from repository."""
+        key = order.order_id.int
+        stored = self._orders.pop(key, None)
+        if stored is None:
+            raise RepNotFoundError('Order for removal is not found')
+        for index in self.indexes.values():
+            index.remove(key)
+        self._change_depth(stored, -stored.quantity)
+
+    def _batch_remove(self, orders: list[Order]) -> None:
+        """Method to remove list of orders from repository. Orders
+        which are not in repository are skipped."""
+        pop = self._orders.pop
+        indexes = self.indexes.values()
+        for order in orders:
+            key = order.order_id.int
+            stored = pop(key, None)
+            if stored is not None:
+                for index in indexes:
+                    index.remove(key)
+                self._change_depth(stored, -stored.quantity)
+
+    def _apply_changes(
+        self,
+        removed: list[Order],
+        updated: list[Order],
+    ) -> None:
+        """Method to apply removals and updates as one transaction."""
+        updated_orders = {order.order_id.int: as_order(order)
+                          for order in updated}
+        if not updated_orders.keys() <= self._orders.keys():
+            raise RepNotFoundError('Order for update is not found')
+        self._batch_remove(removed)
+        for key, order in updated_orders.items():
+            stored = self._orders.get(key)
+            self._orders[key] = order
+            for index in self.indexes.values():
+                if stored is not None:
+                    index.update(key, order)
+                else:
+                    index.add(key, order)
+            if stored is not None:
+                self._change_depth(stored, -stored.quantity)
+            self._change_depth(order, order.quantity)
+
+    def _get_depth(
+        self,
+        order_type: str,
+        levels: int | None = None,
+    ) -> list[tuple[float, int]]:
+        """Method to get aggregated depth of the side from totals of
+        its price levels."""
+        return sorted(self._depth[order_type].items(),
+                      reverse=(order_type == 'buy'))[:levels]
+
+    def _pop_depth_changes(self) -> dict[str, dict[float, int]]:
+        """Method to get price levels changed since the previous call
+        from the set of changed levels of each side."""
+        changes = {}
+        for order_type, changed_levels in self._changed_levels.items():
+            depth = self._depth[order_type]
+            changes[order_type] = {price: depth.get(price, 0)
+                                   for price in sorted(changed_levels)}
+            changed_levels.clear()
+        return changes
+
+    def _count(self, order_type: str | None = None) -> int:
+        """Method to get number of orders in repository."""
+        if order_type is None:
+            return len(self._orders)
+        index = self.indexes.get('order_type')
+        if index is not None:
+            return len(index.get(order_type))
+        return sum(1 for item in self._orders.values()
+                   if item.order_type == order_type)
+
+    def _change_depth(self, order: Order, quantity: int) -> None:
+        """Method changes total quantity of the price level of the order
+        and drops the level when it becomes empty."""
+        depth = self._depth[order.order_type]
+        total = depth.get(order.price, 0) + quantity
+        if total:
+            depth[order.price] = total
+        else:
+            depth.pop(order.price, None)
+        self._changed_levels[order.order_type].add(order.price)
+
+    @staticmethod
+    def _sort(results: list, sort_field: str, reverse_sorting: bool) -> None:
+        """Method sorts orders by the field. Orders with equal value keep
+        order of their arrival in both directions of sorting."""
         if reverse_sorting:
             results.sort(key=lambda item: -getattr(item, sort_field))
         else:
             results.sort(key=lambda item: getattr(item, sort_field))
-        return results
 
-    def _remove(self, order: Order) -> None:
+
+class PriceLevelOrderRepository(AbstractOrderRepository):
+    """Repository keeps orders of each side in price levels sorted by
+    price. Each level is a FIFO queue of orders, so the best bid and ask
+    are available in O(1) and sorted traversal needs no re-sorting.
+    Orders are stored as lightweight `OrderRecord` objects keyed by
+    integer value of order id and are turned back into Order models
+    only when they are returned by `get_by_field`. Price levels are
+    keyed by integer number of price ticks, and each stored order gets
+    sequence number, which grows with time of its arrival to the level.
+    Price, which is not a multiple of tick size, is rejected. Total
+    quantity of each price level is kept up to date on each change, so
+    depth of the book is read without aggregation."""
+
+    def __init__(self, tick_size: float = 0.01):
+        self.tick_size = tick_size
+        self.orders = {}
+        self._levels = {'buy': {}, 'sell': {}}
+        self._prices = {'buy': [], 'sell': []}
+        self._depth = {'buy': {}, 'sell': {}}
+        self._changed_levels = {'buy': set(), 'sell': set()}
+        self._sequence = 0
+
+    def _add(self, order: Order | OrderRecord) -> None:
+        """Method to add order into repository."""
+        key = order.order_id.int
+        if key in self.orders:
+            raise RepAlreadyExistsError('Order is already in repository')
+        record = self._to_record(order)
+        record.ticks = self._to_ticks(record.price)
+        self._sequence += 1
+        record.sequence = self._sequence
+        self.orders[key] = record
+        self._add_to_level(key, record)
+
+    def _check_add(self, order: Order | OrderRecord) -> None:
+        """Method to check that order can be added: its id is new and
+        its price is a multiple of tick size."""
+        if order.order_id.int in self.orders:
+            raise RepAlreadyExistsError('Order is already in repository')
+        self._to_ticks(order.price)
+
+    def _update(self, order: Order | OrderRecord) -> None:
+        """Method to update order in repository. Order keeps its place
+        in the queue, unless its side or price has changed."""
+        key = order.order_id.int
+        old_record = self.orders.get(key)
+        if old_record is None:
+            raise RepNotFoundError('Order for update is not found')
+        record = self._to_record(order)
+        record.ticks = self._to_ticks(record.price)
+        if (old_record.order_type == record.order_type
+                and old_record.ticks == record.ticks):
+            record.sequence = old_record.sequence
+            self.orders[key] = record
+            self._levels[record.order_type][record.ticks][key] = record
+            self._change_depth(record.order_type, record.ticks,
+                               record.quantity - old_record.quantity)
+            return
+        self._sequence += 1
+        record.sequence = self._sequence
+        self.orders[key] = record
+        self._remove_from_level(key, old_record)
+        self._add_to_level(key, record)
+
+    def _get_by_field(
+        self,
+        field: str,
+        value,
+        sort_field: str | None = None,
+        reverse_sorting: bool = False,
+    ) -> list[Order]:
+        """Method to get list of orders from repository, basing on
+        specified field value."""
+        return list(self._iter_by_field(
+            field, value, sort_field, reverse_sorting))
+
+    def _iter_by_field(
+        self,
+        field: str,
+        value,
+        sort_field: str | None = None,
+        reverse_sorting: bool = False,
+    ) -> Iterator[Order]:
+        """Method to lazily iterate over orders from repository. Orders
+        of one side sorted by price are read straight from price levels."""
+        if field == 'order_type' and sort_field == 'price':
+            return map(OrderRecord.to_order,
+                       self._iter_levels(value, reverse_sorting))
+        if field == 'order_id' and not sort_field:
+            record = self.orders.get(value.int)
+            return iter([record.to_order()] if record is not None else [])
+        results = [item for item in self.orders.values()
+                   if getattr(item, field) == value]
+        if sort_field:
+            results.sort(key=lambda item: getattr(item, sort_field),
+                         reverse=reverse_sorting)
+        return map(OrderRecord.to_order, results)
+
+    def _iter_by_range(
+        self,
+        field: str,
+        lower,
+        upper,
+        reverse_sorting: bool,
+        filters: dict,
+    ) -> Iterator[Order]:
+        """Method to lazily iterate over orders with value of the field
+        in the range. Price range of one side is found in its price levels
+        by bisect, other queries are answered by default."""
+        order_type = filters.get('order_type')
+        if field != 'price' or order_type is None:
+            return super()._iter_by_range(
+                field, lower, upper, reverse_sorting, filters)
+        prices = self._prices[order_type]
+        start = (0 if lower is None
+                 else bisect_left(prices, lower / self.tick_size - 1e-6))
+        end = (len(prices) if upper is None
+               else bisect_right(prices, upper / self.tick_size + 1e-6))
+        selected = prices[start:end]
+        levels = self._levels[order_type]
+        return (record.to_order()
+                for ticks in (reversed(selected) if reverse_sorting
+                              else selected)
+                for record in levels[ticks].values()
+                if all(getattr(record, name) == filter_value
+                       for name, filter_value in filters.items()))
+
+    def _iter_records(self, order_type: str) -> Iterator[OrderRecord]:
+        """Method to lazily iterate over records of the specified side
+        in price priority."""
+        return self._iter_levels(order_type, order_type == 'buy')
+
+    def _get_best(self, order_type: str) -> Order | None:
+        """Method to get the best priced order of the specified side."""
+        prices = self._prices[order_type]
+        if not prices:
+            return None
+        ticks = prices[-1] if order_type == 'buy' else prices[0]
+        return next(iter(self._levels[order_type][ticks].values())).to_order()
+
+    def _remove(self, order: Order | OrderRecord) -> None:
         """Method to remove order from repository."""
-        try:
-            self.orders.remove(order)
-        except KeyError:
+        key = order.order_id.int
+        record = self.orders.pop(key, None)
+        if record is None:
             raise RepNotFoundError('Order for removal is not found')
+        self._remove_from_level(key, record)
 
-    def _batch_remove(self, orders: list[Order]) -> None:
+    def _batch_remove(self, orders: list[Order | OrderRecord]) -> None:
         """Method to remove list of orders from repository."""
         for order in orders:
-            try:
-                self.remove(order)
-            except RepNotFoundError:
-                pass
+            key = order.order_id.int
+            record = self.orders.pop(key, None)
+            if record is not None:
+                self._remove_from_level(key, record)
+
+    def _apply_changes(
+        self,
+        removed: list[Order | OrderRecord],
+        updated: list[Order | OrderRecord],
+    ) -> None:
+        """Method to apply removals and updates as one transaction."""
+        if any(order.order_id.int not in self.orders for order in updated):
+            raise RepNotFoundError('Order for update is not found')
+        self._batch_remove(removed)
+        for order in updated:
+            self._update(order)
+
+    def _get_depth(
+        self,
+        order_type: str,
+        levels: int | None = None,
+    ) -> list[tuple[float, int]]:
+        """Method to get aggregated depth of the side from totals of
+        its price levels."""
+        prices = self._prices[order_type]
+        if order_type == 'buy':
+            prices = prices[::-1]
+        depth = self._depth[order_type]
+        return [(self._to_price(ticks), depth[ticks])
+                for ticks in prices[:levels]]
+
+    def _pop_depth_changes(self) -> dict[str, dict[float, int]]:
+        """Method to get price levels changed since the previous call
+        from the set of changed levels of each side."""
+        changes = {}
+        for order_type, changed_levels in self._changed_levels.items():
+            depth = self._depth[order_type]
+            changes[order_type] = {
+                self._to_price(ticks): depth.get(ticks, 0)
+                for ticks in sorted(changed_levels)}
+            changed_levels.clear()
+        return changes
+
+    def _count(self, order_type: str | None = None) -> int:
+        """Method to get number of orders in repository. Orders of one
+        side are counted by sizes of its price levels."""
+        if order_type is None:
+            return len(self.orders)
+        return sum(map(len, self._levels[order_type].values()))
+
+    def _to_ticks(self, price: float) -> int:
+        """Method converts price to integer number of ticks."""
+        ticks = round(price / self.tick_size)
+        if abs(ticks * self.tick_size - price) > self.tick_size * 1e-6:
+            raise RepInvalidPriceError(
+                f'Price {price} is not a multiple of tick size')
+        return ticks
+
+    def _to_price(self, ticks: int) -> float:
+        """Method converts integer number of ticks to price."""
+        return round(ticks * self.tick_size, 10)
+
+    @staticmethod
+    def _to_record(order: Order | OrderRecord) -> OrderRecord:
+        """Method converts Order model to record. Records are stored
+        as they are."""
+        if isinstance(order, OrderRecord):
+            return order
+        return OrderRecord.from_order(order)
+
+    def _iter_levels(self, order_type: str, reverse_sorting: bool):
+        """Generator yields records of the side level by level, keeping
+        FIFO order inside each level."""
+        levels = self._levels[order_type]
+        prices = self._prices[order_type]
+        for ticks in (reversed(prices) if reverse_sorting else prices):
+            yield from levels[ticks].values()
+
+    def _add_to_level(self, key: int, record: OrderRecord) -> None:
+        """Method puts record at the end of its price level queue."""
+        levels = self._levels[record.order_type]
+        level = levels.get(record.ticks)
+        if level is None:
+            level = levels[record.ticks] = {}
+            insort(self._prices[record.order_type], record.ticks)
+        level[key] = record
+        self._change_depth(record.order_type, record.ticks, record.quantity)
+
+    def _remove_from_level(self, key: int, record: OrderRecord) -> None:
+        """Method removes record from its price level queue and drops
+        the level when it becomes empty."""
+        levels = self._levels[record.order_type]
+        level = levels[record.ticks]
+        del level[key]
+        if not level:
+            del levels[record.ticks]
+            prices = self._prices[record.order_type]
+            del prices[bisect_left(prices, record.ticks)]
+            del self._depth[record.order_type][record.ticks]
+            self._changed_levels[record.order_type].add(record.ticks)
+            return
+        self._change_depth(record.order_type, record.ticks, -record.quantity)
+
+    def _change_depth(self, order_type: str, ticks: int, quantity: int):
+        """Method changes total quantity of the price level."""
+        depth = self._depth[order_type]
+        depth[ticks] = depth.get(ticks, 0) + quantity
+        self._changed_levels[order_type].add(ticks)
@@ -0,0 +1,286 @@
+import sqlite3
+from typing import Iterator
+from uuid import UUID
+
+from domain.models import Order, OrderRecord
+from repository.repository import (AbstractOrderRepository,
+                                   RepAlreadyExistsError, RepNotFoundError)
+
+FIELDS = ('order_id', 'timestamp', 'order_type', 'quantity', 'price',
+          'symbol', 'time_in_force', 'expires_at')
+COLUMNS = ', '.join(FIELDS)
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS orders (order_id BLOB PRIMARY KEY, '
+    'timestamp REAL, order_type TEXT, quantity INTEGER, price REAL, '
+    'symbol TEXT, time_in_force TEXT, expires_at REAL, sequence INTEGER)',
+    'CREATE INDEX IF NOT EXISTS orders_by_price ON orders '
+    '(order_type, price, sequence, quantity)',
+)
+INSERT = (f'INSERT INTO orders ({COLUMNS}, sequence) '
+          'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)')
+UPDATE = (
+    'UPDATE orders SET sequence = CASE WHEN order_type = ? AND price = ? '
+    'THEN sequence ELSE ? END, timestamp = ?, order_type = ?, '
+    'quantity = ?, price = ?, symbol = ?, time_in_force = ?, '
+    'expires_at = ? WHERE order_id = ?')
+DELETE = 'DELETE FROM orders WHERE order_id = ?'
+EXISTS = 'SELECT 1 FROM orders WHERE order_id = ?'
+DEPTH = ('SELECT price, SUM(quantity) FROM orders WHERE order_type = ? '
+         'GROUP BY price ORDER BY price {direction} LIMIT ?')
+CHANGED_LEVELS = (
+    'CREATE TEMP TABLE changed_levels (order_type TEXT, price REAL, '
+    'PRIMARY KEY (order_type, price))',
+    'CREATE TEMP TRIGGER level_added AFTER INSERT ON main.orders BEGIN '
+    'INSERT OR IGNORE INTO changed_levels '
+    'VALUES (new.order_type, new.price); END',
+    'CREATE TEMP TRIGGER level_updated AFTER UPDATE ON main.orders BEGIN '
+    'INSERT OR IGNORE INTO changed_levels '
+    'VALUES (old.order_type, old.price), (new.order_type, new.price); END',
+    'CREATE TEMP TRIGGER level_removed AFTER DELETE ON main.orders BEGIN '
+    'INSERT OR IGNORE INTO changed_levels '
+    'VALUES (old.order_type, old.price); END',
+)
+DEPTH_CHANGES = (
+    'SELECT changed.order_type, changed.price, '
+    'COALESCE(SUM(orders.quantity), 0) FROM changed_levels AS changed '
+    'LEFT JOIN orders ON orders.order_type = changed.order_type '
+    'AND orders.price = changed.price '
+    'GROUP BY changed.order_type, changed.price ORDER BY changed.price')
+
+
+class SQLiteOrderRepository(AbstractOrderRepository):
+    """Repository keeps orders in SQLite database, so the book is durable
+    and can be queried by other tools. Changes are collected in one
+    transaction, which is committed by `commit` at the end of a round,
+    and database runs in WAL mode, so readers are not blocked by the
+    writer. Removals and updates of a round are written with
+    `executemany`. Statements are fixed strings, so they are prepared
+    once and reused from statement cache of the connection. Each stored
+    order gets sequence number of its arrival to the price level. Index
+    on side, price, sequence and quantity returns orders of one side in
+    price-time priority without sorting, and also covers depth and
+    count queries. Queries stream rows through cursor. Price levels
+    changed by writes are recorded by temporary triggers, so depth
+    changes are aggregated only for those levels."""
+
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode = WAL')
+        self._db.execute('PRAGMA synchronous = NORMAL')
+        for statement in SCHEMA + CHANGED_LEVELS:
+            self._db.execute(statement)
+        self._sequence = self._db.execute(
+            'SELECT MAX(sequence) FROM orders').fetchone()[0] or 0
+
+    def close(self) -> None:
+        """Method commits changes and closes database."""
+        self._commit()
+        self._db.close()
+
+    def _add(self, order: Order | OrderRecord) -> None:
+        """Method to add order into repository."""
+        self._begin()
+        self._sequence += 1
+        try:
+            self._db.execute(INSERT, (*self._to_row(order), self._sequence))
+        except sqlite3.IntegrityError:
+            raise RepAlreadyExistsError('Order is already in repository')
+
+    def _check_add(self, order: Order | OrderRecord) -> None:
+        """Method to check that order can be added."""
+        if self._db.execute(EXISTS, (order.order_id.bytes,)).fetchone():
+            raise RepAlreadyExistsError('Order is already in repository')
+
+    def _update(self, order: Order | OrderRecord) -> None:
+        """Method to update order in repository. Order keeps its place
+        in the queue, unless its side or price has changed."""
+        self._begin()
+        cursor = self._db.execute(UPDATE, self._to_update_row(order))
+        if not cursor.rowcount:
+            raise RepNotFoundError('Order for update is not found')
+
+    def _get_by_field(
+        self,
+        field: str,
+        value,
+        sort_field: str | None = None,
+        reverse_sorting: bool = False,
+    ) -> list[Order]:
+        """Method to get list of orders from repository, basing on
+        specified field value."""
+        return list(self._iter_by_field(
+            field, value, sort_field, reverse_sorting))
+
+    def _iter_by_field(
+        self,
+        field: str,
+        value,
+        sort_field: str | None = None,
+        reverse_sorting: bool = False,
+    ) -> Iterator[Order]:
+        """Method to lazily iterate over orders from repository. Orders
+        are selected and sorted by database, orders with equal value of
+        the sort field keep order of their arrival."""
+        return map(OrderRecord.to_order, self._iter_rows(
+            {field: value}, sort_field, reverse_sorting))
+
+    def _iter_by_range(
+        self,
+        field: str,
+        lower,
+        upper,
+        reverse_sorting: bool,
+        filters: dict,
+    ) -> Iterator[Order]:
+        """Method to lazily iterate over orders with value of the field
+        in the range. Range is selected by database."""
+        return map(OrderRecord.to_order, self._iter_rows(
+            filters, field, reverse_sorting, lower, upper))
+
+    def _iter_records(self, order_type: str) -> Iterator[OrderRecord]:
+        """Method to lazily iterate over records of the specified side
+        in price priority."""
+        return self._iter_rows(
+            {'order_type': order_type}, 'price', order_type == 'buy')
+
+    def _get_best(self, order_type: str) -> Order | None:
+        """Method to get the best priced order of the specified side."""
+        record = next(self._iter_records(order_type), None)
+        return record.to_order() if record is not None else None
+
+    def _get_depth(
+        self,
+        order_type: str,
+        levels: int | None = None,
+    ) -> list[tuple[float, int]]:
+        """Method to get aggregated depth of the side. Depth is
+        aggregated by database from the index."""
+        direction = 'DESC' if order_type == 'buy' else 'ASC'
+        return self._db.execute(
+            DEPTH.format(direction=direction),
+            (order_type, -1 if levels is None else levels)).fetchall()
+
+    def _pop_depth_changes(self) -> dict[str, dict[float, int]]:
+        """Method to get price levels changed since the previous call
+        from the levels recorded by triggers."""
+        changes = {'buy': {}, 'sell': {}}
+        for order_type, price, quantity in self._db.execute(DEPTH_CHANGES):
+            changes[order_type][price] = quantity
+        self._db.execute('DELETE FROM changed_levels')
+        return changes
+
+    def _remove(self, order: Order | OrderRecord) -> None:
+        """Method to remove order from repository."""
+        self._begin()
+        cursor = self._db.execute(DELETE, (order.order_id.bytes,))
+        if not cursor.rowcount:
+            raise RepNotFoundError('Order for removal is not found')
+
+    def _batch_remove(self, orders: list[Order | OrderRecord]) -> None:
+        """Method to remove list of orders from repository. Orders
+        which are not in repository are skipped."""
+        self._begin()
+        self._db.executemany(
+            DELETE, [(order.order_id.bytes,) for order in orders])
+
+    def _apply_changes(
+        self,
+        removed: list[Order | OrderRecord],
+        updated: list[Order | OrderRecord],
+    ) -> None:
+        """Method to apply removals and updates inside savepoint, which
+        is rolled back, if some updated order is not found."""
+        self._begin()
+        self._db.execute('SAVEPOINT apply_changes')
+        self._db.executemany(
+            DELETE, [(order.order_id.bytes,) for order in removed])
+        cursor = self._db.executemany(
+            UPDATE, [self._to_update_row(order) for order in updated])
+        if cursor.rowcount < len(updated):
+            self._db.execute('ROLLBACK TO apply_changes')
+            self._db.execute('RELEASE apply_changes')
+            raise RepNotFoundError('Order for update is not found')
+        self._db.execute('RELEASE apply_changes')
+
+    def _commit(self) -> None:
+        """Method commits transaction of changes, if there is one."""
+        if self._db.in_transaction:
+            self._db.execute('COMMIT')
+
+    def _count(self, order_type: str | None = None) -> int:
+        """Method to get number of orders in repository."""
+        if order_type is None:
+            cursor = self._db.execute('SELECT COUNT(*) FROM orders')
+        else:
+            cursor = self._db.execute(
+                'SELECT COUNT(*) FROM orders WHERE order_type = ?',
+                (order_type,))
+        return cursor.fetchone()[0]
+
+    def _begin(self) -> None:
+        """Method starts transaction of changes, if there is none."""
+        if not self._db.in_transaction:
+            self._db.execute('BEGIN')
+
+    def _iter_rows(
+        self,
+        filters: dict,
+        sort_field: str | None = None,
+        reverse_sorting: bool = False,
+        lower=None,
+        upper=None,
+    ) -> Iterator[OrderRecord]:
+        """Generator selects records with equal values of the filters and
+        with value of the sort field in the range, and reads them from
+        cursor one by one, so only consumed rows are read. Records are
+        sorted by the sort field and then by sequence number."""
+        conditions = []
+        parameters = []
+        for name, value in filters.items():
+            conditions.append(f'{self._column(name)} = ?')
+            parameters.append(self._to_value(value))
+        if lower is not None:
+            conditions.append(f'{self._column(sort_field)} >= ?')
+            parameters.append(self._to_value(lower))
+        if upper is not None:
+            conditions.append(f'{self._column(sort_field)} <= ?')
+            parameters.append(self._to_value(upper))
+        order = 'sequence'
+        if sort_field:
+            direction = 'DESC' if reverse_sorting else 'ASC'
+            order = f'{self._column(sort_field)} {direction}, sequence'
+        where = ' AND '.join(conditions) or '1'
+        cursor = self._db.execute(
+            f'SELECT {COLUMNS} FROM orders WHERE {where} ORDER BY {order}',
+            parameters)
+        for row in cursor:
+            yield OrderRecord(UUID(bytes=row[0]), *row[1:])
+
+    @staticmethod
+    def _column(field: str) -> str:
+        """Method checks that field is a column of orders table."""
+        if field not in FIELDS:
+            raise ValueError(f'Orders have no field {field}')
+        return field
+
+    @staticmethod
+    def _to_value(value):
+        """Method converts value of a field to value of a column."""
+        return value.bytes if isinstance(value, UUID) else value
+
+    @staticmethod
+    def _to_row(order: Order | OrderRecord) -> tuple:
+        """Method converts order to values of the columns."""
+        return (order.order_id.bytes, order.timestamp, order.order_type,
+                order.quantity, order.price, order.symbol,
+                order.time_in_force, order.expires_at)
+
+    def _to_update_row(self, order: Order | OrderRecord) -> tuple:
+        """Method converts order to parameters of update statement with
+        new sequence number, which is used if order changes its level."""
+        self._sequence += 1
+        return (order.order_type, order.price, self._sequence,
+                order.timestamp, order.order_type, order.quantity,
+                order.price, order.symbol, order.time_in_force,
+                order.expires_at, order.order_id.bytes)
@@ -0,0 +1,405 @@
+import os
+import sqlite3
+import tempfile
+from bisect import bisect_left, insort
+from itertools import chain
+from typing import Iterator
+from uuid import UUID
+
+from domain.models import ORDER_TYPES, SIDES, Order, OrderRecord
+from repository.repository import (AbstractOrderRepository,
+                                   PriceLevelOrderRepository,
+                                   RepAlreadyExistsError, RepNotFoundError)
+
+COLUMNS = ('order_id, side, ticks, sequence, timestamp, quantity, price, '
+           'symbol, time_in_force, expires_at')
+SCHEMA = (
+    'CREATE TABLE spilled_orders (order_id BLOB PRIMARY KEY, '
+    'side INTEGER, ticks INTEGER, sequence INTEGER, timestamp REAL, '
+    'quantity INTEGER, price REAL, symbol TEXT, time_in_force TEXT, '
+    'expires_at REAL)',
+    'CREATE INDEX spilled_levels ON spilled_orders (side, ticks, sequence)',
+)
+FETCH_SIZE = 1000
+
+
+class TieredOrderRepository(PriceLevelOrderRepository):
+    """Repository keeps price levels near the best bid and ask in memory
+    and spills deep levels to SQLite file, so number of orders in memory
+    stays within `max_orders`. When the budget is exceeded, the deepest
+    in-memory level of the side with more levels is spilled as a whole.
+    Every spilled level of a side is worse than every in-memory level of
+    it, so orders of a side are read in price priority from memory and
+    then from disk. When in-memory levels of a side drop below
+    `hot_levels`, because the market moves toward spilled levels, the
+    nearest spilled levels are paged back, if the whole level fits into
+    the remaining budget. Total quantity of each level is kept in memory
+    for both tiers, and number of orders of each spilled level is kept
+    next to it. Spill file is scratch storage:
+    it is created empty and, if it is temporary, removed by `close`."""
+
+    def __init__(
+        self,
+        path: str | None = None,
+        max_orders: int = 100_000,
+        hot_levels: int = 10,
+        tick_size: float = 0.01,
+    ):
+        super().__init__(tick_size)
+        self.max_orders = max_orders
+        self.hot_levels = hot_levels
+        self._spilled_prices = {'buy': [], 'sell': []}
+        self._spilled_count = {'buy': 0, 'sell': 0}
+        self._spilled_sizes = {'buy': {}, 'sell': {}}
+        self._temp_path = None
+        if path is None:
+            descriptor, path = tempfile.mkstemp(suffix='.sqlite')
+            os.close(descriptor)
+            self._temp_path = path
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute('PRAGMA journal_mode = OFF')
+        self._db.execute('PRAGMA synchronous = OFF')
+        self._db.execute('DROP TABLE IF EXISTS spilled_orders')
+        for statement in SCHEMA:
+            self._db.execute(statement)
+
+    def close(self) -> None:
+        """Method closes spill file and removes it, if it is temporary."""
+        self._db.close()
+        if self._temp_path:
+            os.remove(self._temp_path)
+            self._temp_path = None
+
+    def spilled_count(self, order_type: str | None = None) -> int:
+        """Method returns number of orders of the side, or of all orders,
+        which are spilled to disk."""
+        if order_type is None:
+            return sum(self._spilled_count.values())
+        return self._spilled_count[order_type]
+
+    def _add(self, order: Order | OrderRecord) -> None:
+        """Method to add order into repository. Order of spilled price
+        region is written straight to disk."""
+        key = order.order_id.int
+        if key in self.orders or self._read_spilled(order.order_id):
+            raise RepAlreadyExistsError('Order is already in repository')
+        ticks = self._to_ticks(order.price)
+        if not self._is_spilled_region(order.order_type, ticks):
+            super()._add(order)
+            self._spill_if_needed()
+            return
+        record = self._to_record(order)
+        record.ticks = ticks
+        self._sequence += 1
+        record.sequence = self._sequence
+        self._write_spilled([record])
+
+    def _check_add(self, order: Order | OrderRecord) -> None:
+        """Method to check that order can be added. Spilled orders are
+        looked up on disk."""
+        super()._check_add(order)
+        if self._read_spilled(order.order_id):
+            raise RepAlreadyExistsError('Order is already in repository')
+
+    def _update(self, order: Order | OrderRecord) -> None:
+        """Method to update order in repository, moving it between
+        tiers, if its price level moves between them."""
+        key = order.order_id.int
+        ticks = self._to_ticks(order.price)
+        is_spilled = self._is_spilled_region(order.order_type, ticks)
+        old_record = self.orders.get(key)
+        if old_record is not None:
+            if not is_spilled:
+                super()._update(order)
+                return
+            super()._remove(order)
+        else:
+            old_record = self._read_spilled(order.order_id)
+            if old_record is None:
+                raise RepNotFoundError('Order for update is not found')
+            self._delete_spilled(old_record)
+        record = self._to_record(order)
+        record.ticks = ticks
+        if (old_record.order_type == record.order_type
+                and old_record.ticks == ticks):
+            record.sequence = old_record.sequence
+        else:
+            self._sequence += 1
+            record.sequence = self._sequence
+        if is_spilled:
+            self._write_spilled([record])
+        else:
+            self.orders[key] = record
+            self._add_to_level(key, record)
+            self._spill_if_needed()
+
+    def _iter_by_field(
+        self,
+        field: str,
+        value,
+        sort_field: str | None = None,
+        reverse_sorting: bool = False,
+    ) -> Iterator[Order]:
+        """Method to lazily iterate over orders from repository. Orders
+        of one side sorted by price are read from memory and then from
+        disk, other queries scan both tiers."""
+        if field == 'order_type' and sort_field == 'price':
+            return super()._iter_by_field(
+                field, value, sort_field, reverse_sorting)
+        if field == 'order_id' and not sort_field:
+            record = (self.orders.get(value.int)
+                      or self._read_spilled(value))
+            return iter([record.to_order()] if record is not None else [])
+        results = [item for item in chain(self.orders.values(),
+                                          self._iter_spilled())
+                   if getattr(item, field) == value]
+        if sort_field:
+            results.sort(key=lambda item: getattr(item, sort_field),
+                         reverse=reverse_sorting)
+        return map(OrderRecord.to_order, results)
+
+    def _iter_by_range(
+        self,
+        field: str,
+        lower,
+        upper,
+        reverse_sorting: bool,
+        filters: dict,
+    ) -> Iterator[Order]:
+        """Method to lazily iterate over orders with value of the field
+        in the range, reading both tiers."""
+        return AbstractOrderRepository._iter_by_range(
+            self, field, lower, upper, reverse_sorting, filters)
+
+    def _get_best(self, order_type: str) -> Order | None:
+        """Method to get the best priced order of the specified side."""
+        record = next(self._iter_levels(order_type, order_type == 'buy'),
+                      None)
+        return record.to_order() if record is not None else None
+
+    def _remove(self, order: Order | OrderRecord) -> None:
+        """Method to remove order from repository."""
+        if order.order_id.int in self.orders:
+            super()._remove(order)
+        else:
+            record = self._read_spilled(order.order_id)
+            if record is None:
+                raise RepNotFoundError('Order for removal is not found')
+            self._delete_spilled(record)
+        self._page_in_if_needed()
+
+    def _batch_remove(self, orders: list[Order | OrderRecord]) -> None:
+        """Method to remove list of orders from repository."""
+        for order in orders:
+            key = order.order_id.int
+            record = self.orders.pop(key, None)
+            if record is not None:
+                self._remove_from_level(key, record)
+                continue
+            if self._spilled_count[order.order_type]:
+                record = self._read_spilled(order.order_id)
+                if record is not None:
+                    self._delete_spilled(record)
+        self._page_in_if_needed()
+
+    def _apply_changes(
+        self,
+        removed: list[Order | OrderRecord],
+        updated: list[Order | OrderRecord],
+    ) -> None:
+        """Method to apply removals and updates as one transaction."""
+        if any(order.order_id.int not in self.orders
+               and self._read_spilled(order.order_id) is None
+               for order in updated):
+            raise RepNotFoundError('Order for update is not found')
+        self._batch_remove(removed)
+        for order in updated:
+            self._update(order)
+        self._page_in_if_needed()
+
+    def _count(self, order_type: str | None = None) -> int:
+        """Method to get number of orders in both tiers."""
+        return super()._count(order_type) + self.spilled_count(order_type)
+
+    def _get_depth(
+        self,
+        order_type: str,
+        levels: int | None = None,
+    ) -> list[tuple[float, int]]:
+        """Method to get aggregated depth of the side from totals of
+        in-memory and spilled price levels."""
+        prices = self._prices[order_type]
+        spilled_prices = self._spilled_prices[order_type]
+        if order_type == 'buy':
+            prices = prices[::-1] + spilled_prices[::-1]
+        else:
+            prices = prices + spilled_prices
+        depth = self._depth[order_type]
+        return [(self._to_price(ticks), depth[ticks])
+                for ticks in prices[:levels]]
+
+    def _iter_levels(self, order_type: str, reverse_sorting: bool):
+        """Generator yields records of the side level by level, keeping
+        FIFO order inside each level. Spilled levels are read from disk
+        in pages, without moving them to memory."""
+        if reverse_sorting == (order_type == 'buy'):
+            yield from super()._iter_levels(order_type, reverse_sorting)
+            yield from self._iter_spilled(order_type, best_first=True)
+        else:
+            yield from self._iter_spilled(order_type, best_first=False)
+            yield from super()._iter_levels(order_type, reverse_sorting)
+
+    def _is_spilled_region(self, order_type: str, ticks: int) -> bool:
+        """Method checks that price level belongs to spilled tier: it is
+        not better than the best spilled level of the side."""
+        spilled_prices = self._spilled_prices[order_type]
+        if not spilled_prices:
+            return False
+        if order_type == 'buy':
+            return ticks <= spilled_prices[-1]
+        return ticks >= spilled_prices[0]
+
+    def _spill_if_needed(self) -> None:
+        """Method spills the deepest in-memory levels while number of
+        orders in memory exceeds the budget. The best level of each side
+        always stays in memory."""
+        while len(self.orders) > self.max_orders:
+            order_type = max(('buy', 'sell'),
+                             key=lambda side: len(self._prices[side]))
+            prices = self._prices[order_type]
+            if len(prices) < 2:
+                return
+            self._spill_level(
+                order_type, prices.pop(0 if order_type == 'buy' else -1))
+
+    def _page_in_if_needed(self) -> None:
+        """Method pages back the nearest spilled levels of each side,
+        while the side has less than `hot_levels` levels in memory and
+        the nearest level fits into the remaining budget."""
+        for order_type, spilled_prices in self._spilled_prices.items():
+            sizes = self._spilled_sizes[order_type]
+            while (spilled_prices
+                   and len(self._prices[order_type]) < self.hot_levels):
+                ticks = spilled_prices[-1 if order_type == 'buy' else 0]
+                if len(self.orders) + sizes[ticks] > self.max_orders:
+                    break
+                self._page_in_level(order_type, ticks)
+
+    def _spill_level(self, order_type: str, ticks: int) -> None:
+        """Method moves price level from memory to disk. Total quantity
+        of the level is not changed."""
+        level = self._levels[order_type].pop(ticks)
+        for key in level:
+            del self.orders[key]
+        self._insert_spilled(level.values())
+        insort(self._spilled_prices[order_type], ticks)
+
+    def _page_in_level(self, order_type: str, ticks: int) -> None:
+        """Method moves price level from disk to memory in order of
+        sequence numbers. Total quantity of the level is not changed."""
+        rows = self._db.execute(
+            f'SELECT {COLUMNS} FROM spilled_orders WHERE side = ? AND '
+            'ticks = ? ORDER BY sequence',
+            (SIDES[order_type], ticks)).fetchall()
+        self._db.execute(
+            'DELETE FROM spilled_orders WHERE side = ? AND ticks = ?',
+            (SIDES[order_type], ticks))
+        level = self._levels[order_type][ticks] = {}
+        for row in rows:
+            record = self._to_spilled_record(row)
+            key = record.order_id.int
+            level[key] = self.orders[key] = record
+        insort(self._prices[order_type], ticks)
+        spilled_prices = self._spilled_prices[order_type]
+        del spilled_prices[bisect_left(spilled_prices, ticks)]
+        del self._spilled_sizes[order_type][ticks]
+        self._spilled_count[order_type] -= len(rows)
+
+    def _write_spilled(self, records: list[OrderRecord]) -> None:
+        """Method writes new records of spilled region to disk."""
+        self._insert_spilled(records)
+        for record in records:
+            spilled_prices = self._spilled_prices[record.order_type]
+            if record.ticks not in self._depth[record.order_type]:
+                insort(spilled_prices, record.ticks)
+            self._change_depth(record.order_type, record.ticks,
+                               record.quantity)
+
+    def _insert_spilled(self, records) -> None:
+        """Method inserts records into spill file."""
+        rows = [(record.order_id.bytes, SIDES[record.order_type],
+                 record.ticks, record.sequence, record.timestamp,
+                 record.quantity, record.price, record.symbol,
+                 record.time_in_force, record.expires_at)
+                for record in records]
+        self._db.executemany(
+            f'INSERT INTO spilled_orders ({COLUMNS}) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        for row in rows:
+            order_type = ORDER_TYPES[row[1]]
+            self._spilled_count[order_type] += 1
+            sizes = self._spilled_sizes[order_type]
+            sizes[row[2]] = sizes.get(row[2], 0) + 1
+
+    def _delete_spilled(self, record: OrderRecord) -> None:
+        """Method deletes spilled record and drops its price level, when
+        it becomes empty."""
+        self._db.execute('DELETE FROM spilled_orders WHERE order_id = ?',
+                         (record.order_id.bytes,))
+        order_type = record.order_type
+        self._spilled_count[order_type] -= 1
+        sizes = self._spilled_sizes[order_type]
+        sizes[record.ticks] -= 1
+        depth = self._depth[order_type]
+        if not sizes[record.ticks]:
+            del sizes[record.ticks]
+            del depth[record.ticks]
+            self._changed_levels[order_type].add(record.ticks)
+            spilled_prices = self._spilled_prices[order_type]
+            del spilled_prices[bisect_left(spilled_prices, record.ticks)]
+            return
+        self._change_depth(order_type, record.ticks, -record.quantity)
+
+    def _read_spilled(self, order_id: UUID) -> OrderRecord | None:
+        """Method reads spilled record of the order, if there is one."""
+        if not any(self._spilled_count.values()):
+            return None
+        row = self._db.execute(
+            f'SELECT {COLUMNS} FROM spilled_orders WHERE order_id = ?',
+            (order_id.bytes,)).fetchone()
+        return self._to_spilled_record(row) if row else None
+
+    def _iter_spilled(
+        self,
+        order_type: str | None = None,
+        best_first: bool = True,
+    ) -> Iterator[OrderRecord]:
+        """Generator reads spilled records of the side in price-time
+        priority, or in reverse order of price levels, in pages. If side
+        is not set, all spilled records are read."""
+        if order_type is None:
+            query, parameters = f'SELECT {COLUMNS} FROM spilled_orders', ()
+        else:
+            if not self._spilled_count[order_type]:
+                return
+            direction = ('DESC' if (order_type == 'buy') == best_first
+                         else 'ASC')
+            query = (f'SELECT {COLUMNS} FROM spilled_orders WHERE side = ? '
+                     f'ORDER BY ticks {direction}, sequence')
+            parameters = (SIDES[order_type],)
+        cursor = self._db.execute(query, parameters)
+        while rows := cursor.fetchmany(FETCH_SIZE):
+            yield from map(self._to_spilled_record, rows)
+
+    @staticmethod
+    def _to_spilled_record(row: tuple) -> OrderRecord:
+        """Method converts row of spill file to record."""
+        (order_id, side, ticks, sequence, timestamp, quantity, price,
+         symbol, time_in_force, expires_at) = row
+        record = OrderRecord(UUID(bytes=order_id), timestamp,
+                             ORDER_TYPES[side], quantity, price, symbol,
+                             time_in_force, expires_at)
+        record.ticks = ticks
+        record.sequence = sequence
+        return record
@@ -0,0 +1,138 @@
+import asyncio
+
+from pydantic import ValidationError
+
+from domain.models import Order, OrderBook, validate_orders_json
+from repository.repository import RepAlreadyExistsError, RepInvalidPriceError
+
+REJECTED_ERRORS = (RepAlreadyExistsError, RepInvalidPriceError)
+
+
+class AsyncOrderGateway:
+    """Asyncio front end of order book. Producers submit orders into
+    bounded queue, directly or over local TCP socket, and wait when the
+    queue is full. Single matching task drains the queue in micro-batches,
+    matches them on arrival and publishes results of each micro-batch
+    to subscribers. Order book is touched only by the matching task.
+    Order, which the book rejects, e.g. with duplicate id or price out
+    of tick, is skipped and counted in `rejected`, so the task keeps
+    draining the queue."""
+
+    def __init__(
+        self,
+        order_book: OrderBook,
+        max_queue_size: int = 10_000,
+        batch_size: int = 500,
+    ):
+        self.order_book = order_book
+        self.batch_size = batch_size
+        self.queue = asyncio.Queue(max_queue_size)
+        self.rejected = 0
+        self._subscribers = []
+        self._task = None
+        self._server = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+    def start(self) -> None:
+        """Method starts matching task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._match_orders())
+
+    async def stop(self) -> None:
+        """Method stops socket server, waits until all submitted orders
+        are matched and stops matching task."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._task is not None:
+            if not self._task.done():
+                await self.queue.put(None)
+            task, self._task = self._task, None
+            await task
+
+    async def submit(self, order: Order) -> None:
+        """Method puts order into the queue, waiting while it is full."""
+        await self.queue.put(order)
+
+    def subscribe(self, max_queue_size: int = 0) -> asyncio.Queue:
+        """Method returns queue which receives list of matched orders
+        and list of partially matched orders of each micro-batch. Full
+        subscriber queue slows down matching task."""
+        subscriber = asyncio.Queue(max_queue_size)
+        self._subscribers.append(subscriber)
+        return subscriber
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 0):
+        """Method starts TCP server which accepts orders as JSON lines
+        and answers each line with `ok` or with validation error. Line
+        can also hold JSON array of orders, which is validated in one
+        pass and accepted or rejected as a whole. Returns address the
+        server listens to."""
+        self._server = await asyncio.start_server(
+            self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def _handle_connection(self, reader, writer) -> None:
+        """Method reads orders of one producer. Next line is not read
+        until the order is put into the queue."""
+        try:
+            while line := await reader.readline():
+                try:
+                    if line.lstrip().startswith(b'['):
+                        orders = validate_orders_json(line)
+                    else:
+                        orders = [Order.model_validate_json(line)]
+                except ValidationError as error:
+                    writer.write(
+                        f'error {error.error_count()} validation '
+                        f'errors\n'.encode())
+                else:
+                    for order in orders:
+                        await self.submit(order)
+                    writer.write(b'ok\n')
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def _match_orders(self) -> None:
+        """Method drains the queue in micro-batches and matches them
+        until it receives `None`."""
+        while True:
+            order = await self.queue.get()
+            batch = []
+            while order is not None:
+                batch.append(order)
+                if len(batch) >= self.batch_size or self.queue.empty():
+                    break
+                order = self.queue.get_nowait()
+            if batch:
+                result = self._match_batch(batch)
+                self.order_book.commit()
+                for subscriber in self._subscribers:
+                    await subscriber.put(result)
+            if order is None:
+                return
+
+    def _match_batch(self, batch: list[Order]) -> tuple[list, list]:
+        """Method matches micro-batch order by order and returns list
+        of matched orders and list of partially matched orders. Rejected
+        orders are counted and skipped."""
+        matched_orders = []
+        partially_matched_orders = []
+        for order in batch:
+            try:
+                order_matched, order_partial = (
+                    self.order_book.add_and_match(order))
+            except REJECTED_ERRORS:
+                self.rejected += 1
+                continue
+            matched_orders.extend(order_matched)
+            partially_matched_orders.extend(order_partial)
+        return matched_orders, partially_matched_orders
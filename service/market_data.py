@@ -0,0 +1,59 @@
+from domain.models import OrderBook
+
+
+class MarketDataFeed:
+    """Feed of aggregated market data of order book. Depth of the book
+    is maintained by repository as orders are added, matched and
+    removed, and `end_round` publishes only price levels and top of
+    the book, which have changed since the previous round, to
+    subscribers."""
+
+    def __init__(self, order_book: OrderBook, levels: int = 10):
+        self.order_book = order_book
+        self.levels = levels
+        self.round = 0
+        self._top_of_book = None
+        self._subscribers = []
+
+    def subscribe(self, callback) -> None:
+        """Method registers callback, which receives update of each
+        round."""
+        self._subscribers.append(callback)
+
+    def depth(self) -> dict[str, list[tuple[float, int]]]:
+        """Method returns the best price levels of each side with total
+        quantity of each level."""
+        repository = self.order_book.orders
+        return {order_type: repository.get_depth(order_type, self.levels)
+                for order_type in ('buy', 'sell')}
+
+    def top_of_book(self) -> dict:
+        """Method returns best bid and ask with their total quantity.
+        Price and quantity of empty side are None."""
+        top_of_book = {}
+        for order_type, name in (('buy', 'bid'), ('sell', 'ask')):
+            depth = self.order_book.orders.get_depth(order_type, 1)
+            price, quantity = depth[0] if depth else (None, None)
+            top_of_book[name] = price
+            top_of_book[f'{name}_quantity'] = quantity
+        return top_of_book
+
+    def end_round(self) -> dict:
+        """Method returns update of the round and passes it to
+        subscribers. Update holds changed price levels of each side as
+        lists of price and new total quantity, where zero quantity means
+        removed level, and top of the book, if it has changed."""
+        self.round += 1
+        changes = self.order_book.orders.pop_depth_changes()
+        update = {
+            'round': self.round,
+            'buy': sorted(changes['buy'].items(), reverse=True),
+            'sell': sorted(changes['sell'].items()),
+        }
+        top_of_book = self.top_of_book()
+        if top_of_book != self._top_of_book:
+            update['top_of_book'] = top_of_book
+            self._top_of_book = top_of_book
+        for callback in self._subscribers:
+            callback(update)
+        return update
@@ -0,0 +1,232 @@
+import json
+import os
+import sys
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Iterator
+
+LATENCY_BUCKETS = tuple(10 ** (exponent / 2) * 1e-6
+                        for exponent in range(0, 15))
+
+REPOSITORY_METHODS = ('add', 'update', 'get_by_field', 'get_by_range',
+                      'get_best', 'remove', 'batch_remove', 'apply_changes',
+                      'commit')
+ORDER_BOOK_METHODS = ('match', 'add_and_match', 'batch_add_and_match')
+
+
+class LatencyHistogram:
+    """Histogram of latencies in seconds with fixed buckets from 1
+    microsecond to 10 seconds."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, duration: float) -> None:
+        """Method adds latency to the histogram."""
+        self.counts[bisect_left(self.buckets, duration)] += 1
+        self.count += 1
+        self.sum += duration
+
+    def percentile(self, share: float) -> float | None:
+        """Method returns upper bound of the bucket which contains the
+        specified share of latencies."""
+        if not self.count:
+            return None
+        rank = share * self.count
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            if total >= rank:
+                return bound
+        return float('inf')
+
+    def to_dict(self) -> dict:
+        """Method returns summary of the histogram."""
+        return {
+            'count': self.count,
+            'sum_sec': self.sum,
+            'p50_sec': self.percentile(0.5),
+            'p90_sec': self.percentile(0.9),
+            'p99_sec': self.percentile(0.99),
+        }
+
+
+class MetricsRecorder:
+    """Recorder of metrics of matching rounds. It collects latency
+    histograms of instrumented calls and, at the end of each round,
+    round latency, fills per second, book depth per side, spread and
+    number of memory blocks allocated during the round. Metrics are
+    exported as JSON lines or as Prometheus text file."""
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {'rounds': 0, 'orders_generated': 0, 'fills': 0}
+        self.gauges = {}
+        self._round_start = time.perf_counter()
+        self._round_blocks = sys.getallocatedblocks()
+        self._round_fills = 0
+
+    def record(self, name: str, duration: float) -> None:
+        """Method adds latency of the named call."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        histogram.record(duration)
+
+    @contextmanager
+    def timed(self, name: str):
+        """Context manager records latency of its block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def wrap(self, name: str, func):
+        """Method returns function, which records latency of each call
+        of the specified function."""
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return wrapper
+
+    def count_fills(self, result) -> None:
+        """Method counts matched and partially matched orders of the
+        result of matching."""
+        self._round_fills += len(result[0]) + len(result[1])
+
+    def end_round(self, order_book) -> dict:
+        """Method closes the round: records its latency and state of the
+        order book, and returns metrics of the round."""
+        now = time.perf_counter()
+        duration = now - self._round_start
+        blocks = sys.getallocatedblocks()
+        self.record('round', duration)
+        self.counters['rounds'] += 1
+        self.counters['fills'] += self._round_fills
+        repository = order_book.orders
+        best_buy = repository.get_best('buy')
+        best_sell = repository.get_best('sell')
+        self.gauges = {
+            'round_latency_sec': duration,
+            'fills_per_sec': self._round_fills / duration if duration else 0,
+            'depth_buy': repository.count('buy'),
+            'depth_sell': repository.count('sell'),
+            'spread': (best_sell.price - best_buy.price
+                       if best_buy and best_sell else None),
+            'allocated_blocks_delta': blocks - self._round_blocks,
+        }
+        self._round_start = now
+        self._round_blocks = blocks
+        self._round_fills = 0
+        return dict(self.gauges)
+
+    def to_dict(self) -> dict:
+        """Method returns all collected metrics."""
+        return {
+            'timestamp': time.time(),
+            **self.counters,
+            **self.gauges,
+            'latency': {name: histogram.to_dict()
+                        for name, histogram in self.histograms.items()},
+        }
+
+    def write_json_line(self, file) -> None:
+        """Method writes all collected metrics as one JSON line."""
+        file.write(json.dumps(self.to_dict()) + '\n')
+        file.flush()
+
+    def write_prometheus(self, path: str) -> None:
+        """Method writes all collected metrics to file in Prometheus
+        text format. File is replaced atomically."""
+        lines = []
+        for name, value in self.counters.items():
+            lines.append(f'# TYPE market_{name}_total counter')
+            lines.append(f'market_{name}_total {value}')
+        for name, value in self.gauges.items():
+            if value is not None:
+                lines.append(f'# TYPE market_{name} gauge')
+                lines.append(f'market_{name} {value}')
+        lines.append('# TYPE market_latency_seconds histogram')
+        for name, histogram in self.histograms.items():
+            total = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                total += count
+                lines.append(f'market_latency_seconds_bucket{{call="{name}",'
+                             f'le="{bound:.6g}"}} {total}')
+            lines.append(f'market_latency_seconds_bucket{{call="{name}",'
+                         f'le="+Inf"}} {histogram.count}')
+            lines.append(f'market_latency_seconds_sum{{call="{name}"}} '
+                         f'{histogram.sum}')
+            lines.append(f'market_latency_seconds_count{{call="{name}"}} '
+                         f'{histogram.count}')
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+        os.replace(temp_path, path)
+
+
+class InstrumentedRepository:
+    """Proxy of order repository, which records latency of each call
+    of its public methods. Lazy iterators are not timed, as their cost
+    is paid by the caller and is included in latency of matching."""
+
+    def __init__(self, repository, recorder: MetricsRecorder):
+        self.repository = repository
+        for name in REPOSITORY_METHODS:
+            setattr(self, name, recorder.wrap(
+                f'repository.{name}', getattr(repository, name)))
+
+    def __getattr__(self, name):
+        return getattr(self.repository, name)
+
+    def __len__(self) -> int:
+        return len(self.repository)
+
+
+def instrument_order_book(order_book, recorder: MetricsRecorder):
+    """Function installs hooks, which record latency of matching and
+    repository calls of the order book and count fills. Returns the
+    same order book."""
+    if not isinstance(order_book.orders, InstrumentedRepository):
+        order_book.orders = InstrumentedRepository(
+            order_book.orders, recorder)
+    for name in ORDER_BOOK_METHODS:
+        method = recorder.wrap(f'order_book.{name}',
+                               getattr(type(order_book), name))
+        count_fills = name != 'batch_add_and_match'
+
+        def hook(*args, method=method, count_fills=count_fills, **kwargs):
+            result = method(order_book, *args, **kwargs)
+            if count_fills:
+                recorder.count_fills(result)
+            return result
+        setattr(order_book, name, hook)
+    return order_book
+
+
+def instrument_generator(
+    batches: Iterator[list],
+    recorder: MetricsRecorder,
+) -> Iterator[list]:
+    """Generator records latency of generation of each batch of orders
+    and counts generated orders. Batch can be list of orders or flow
+    batch with list of orders."""
+    while True:
+        start = time.perf_counter()
+        batch = next(batches, None)
+        if batch is None:
+            return
+        recorder.record('generate_orders', time.perf_counter() - start)
+        recorder.counters['orders_generated'] += len(
+            getattr(batch, 'orders', batch))
+        yield batch
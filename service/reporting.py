@@ -0,0 +1,145 @@
+import logging
+import queue
+import sys
+import threading
+from logging.handlers import RotatingFileHandler
+
+VERBOSITY = ('quiet', 'summary', 'orders')
+
+
+def format_round_report(
+    market_round: int,
+    added_orders: int,
+    matched: list | int,
+    partial: list | int,
+    unmatched_orders: int,
+) -> str:
+    """Function formats message with the results of trade in the
+    specified round. Matched and partially matched orders are listed,
+    if they are passed as lists, or only counted, if they are passed
+    as numbers."""
+    end_string = '\n' + '-' * 20 + '\n'
+    separator = '-' * 20 + '\n'
+    lines = [f'Round {market_round}', end_string]
+    if isinstance(matched, list):
+        lines.append('Matched orders:\n')
+        lines.extend(f'{item}\n' for item in matched)
+        lines.append(separator)
+        lines.append('Partially  matched orders:\n')
+        lines.extend(f'{item}\n' for item in partial)
+        lines.append(separator)
+        matched = len(matched)
+        partial = len(partial)
+    lines.append('Summary:\n')
+    lines.append(f'Orders added: {added_orders}\n')
+    lines.append(f'Orders matched in full: {matched}\n')
+    lines.append(f'Orders matched in part: {partial}\n')
+    lines.append(f'Orders unmatched: {unmatched_orders}')
+    lines.append(end_string)
+    return ''.join(lines)
+
+
+class ReportWriter:
+    """Writer of round reports in background thread. Matching loop only
+    puts compact result of the round into bounded queue: lists of orders
+    are kept only at `orders` verbosity, otherwise only their numbers.
+    Writer thread formats queued reports and writes all of them with one
+    write and one flush. If the queue is full, because output is slow,
+    report is dropped and counted instead of stalling the matching loop.
+    Only every `sample_every` round is reported. Output is file object,
+    stdout by default, or file by path, which is rotated after
+    `max_bytes`, if it is set."""
+
+    def __init__(
+        self,
+        output=None,
+        verbosity: str = 'orders',
+        sample_every: int = 1,
+        max_queue_size: int = 1000,
+        max_bytes: int = 0,
+        backup_count: int = 3,
+    ):
+        if verbosity not in VERBOSITY:
+            raise ValueError(f'Verbosity should be one of {VERBOSITY}')
+        self.verbosity = verbosity
+        self.sample_every = max(1, sample_every)
+        self.dropped = 0
+        self._queue = queue.Queue(max_queue_size)
+        self._handler = None
+        self._file = None
+        if isinstance(output, str):
+            if max_bytes:
+                self._handler = RotatingFileHandler(
+                    output, maxBytes=max_bytes, backupCount=backup_count)
+                self._handler.terminator = ''
+            else:
+                self._file = open(output, 'a')
+        self._output = output if not isinstance(output, str) else None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def submit(
+        self,
+        market_round: int,
+        added_orders: int,
+        matched_list: list,
+        partial_list: list,
+        unmatched_orders: int,
+    ) -> None:
+        """Method hands result of the round to writer thread without
+        waiting."""
+        if self.verbosity == 'quiet' or market_round % self.sample_every:
+            return
+        if self.verbosity == 'orders':
+            report = (market_round, added_orders, list(matched_list),
+                      list(partial_list), unmatched_orders)
+        else:
+            report = (market_round, added_orders, len(matched_list),
+                      len(partial_list), unmatched_orders)
+        try:
+            self._queue.put_nowait(report)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        """Method waits until queued reports are written and stops
+        writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if self._handler:
+            self._handler.close()
+        if self._file:
+            self._file.close()
+
+    def _run(self) -> None:
+        """Method writes queued reports until it receives `None`."""
+        while True:
+            reports = [self._queue.get()]
+            while reports[-1] is not None:
+                try:
+                    reports.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            is_closed = reports[-1] is None
+            text = ''.join(format_round_report(*report)
+                           for report in reports if report is not None)
+            if text:
+                self._write(text)
+            if is_closed:
+                return
+
+    def _write(self, text: str) -> None:
+        """Method writes text to output and flushes it."""
+        if self._handler:
+            self._handler.emit(logging.makeLogRecord({'msg': text}))
+            return
+        output = self._file or self._output or sys.stdout
+        output.write(text)
+        output.flush()
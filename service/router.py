@@ -0,0 +1,151 @@
+import multiprocessing
+import os
+import zlib
+from collections import defaultdict
+
+from domain.models import Order, OrderBook
+from repository.repository import PriceLevelOrderRepository
+from service.ingestion import REJECTED_ERRORS
+
+
+def default_book_factory(symbol: str) -> OrderBook:
+    """Function creates order book of the instrument."""
+    return OrderBook(PriceLevelOrderRepository())
+
+
+def match_orders(
+    order_book: OrderBook,
+    orders: list[Order],
+) -> tuple[list[Order], list[Order], list[Order]]:
+    """Function matches orders one by one on arrival and returns list of
+    matched orders, list of partially matched orders and list of orders,
+    which the book rejects, e.g. with duplicate id or price out of
+    tick. Rejected orders are skipped."""
+    matched_orders = []
+    partially_matched_orders = []
+    rejected_orders = []
+    for order in orders:
+        try:
+            order_matched, order_partial = order_book.add_and_match(order)
+        except REJECTED_ERRORS:
+            rejected_orders.append(order)
+            continue
+        matched_orders.extend(order_matched)
+        partially_matched_orders.extend(order_partial)
+    return matched_orders, partially_matched_orders, rejected_orders
+
+
+def _worker(connection, book_factory) -> None:
+    """Function runs in worker process. It keeps order books of the
+    instruments of its shard and serves commands of the router until
+    it receives `None`. Results of a round are sent together with
+    orders rejected by the books, so a bad order does not stop the
+    worker."""
+    books = {}
+    while (message := connection.recv()) is not None:
+        command, payload = message
+        if command == 'round':
+            results = {}
+            rejected = {}
+            for symbol, orders in payload.items():
+                if symbol not in books:
+                    books[symbol] = book_factory(symbol)
+                matched, partial, rejected_orders = match_orders(
+                    books[symbol], orders)
+                results[symbol] = matched, partial
+                if rejected_orders:
+                    rejected[symbol] = rejected_orders
+                books[symbol].commit()
+            connection.send((results, rejected))
+        elif command == 'sizes':
+            connection.send(
+                {symbol: len(book.orders) for symbol, book in books.items()})
+
+
+class MarketRouter:
+    """Router shards order books of instruments across pool of worker
+    processes. Orders submitted during a round are buffered, grouped by
+    instrument and sent to workers in one batch per worker. Each worker
+    matches its own books independently, and fills come back in one
+    batch per worker as well. Instrument is assigned to worker by stable
+    hash of its symbol, so its book always lives in the same process.
+    Orders, which the books reject, are skipped: they are counted in
+    `rejected`, and orders rejected in the last round are kept in
+    `rejected_orders` by instrument."""
+
+    def __init__(self, workers: int | None = None, book_factory=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.rejected = 0
+        self.rejected_orders = {}
+        self._buffers = [defaultdict(list) for _ in range(self.workers)]
+        self._connections = []
+        self._processes = []
+        for _ in range(self.workers):
+            parent_connection, child_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_worker,
+                args=(child_connection,
+                      book_factory or default_book_factory),
+                daemon=True)
+            process.start()
+            child_connection.close()
+            self._connections.append(parent_connection)
+            self._processes.append(process)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def shard(self, symbol: str) -> int:
+        """Method returns number of worker which keeps order book of
+        the instrument."""
+        return zlib.crc32(symbol.encode()) % self.workers
+
+    def submit(self, orders: list[Order]) -> None:
+        """Method buffers orders until the next round."""
+        for order in orders:
+            self._buffers[self.shard(order.symbol)][order.symbol].append(
+                order)
+
+    def match_round(self) -> dict[str, tuple[list[Order], list[Order]]]:
+        """Method sends buffered orders to workers, which match them
+        on arrival, and returns list of matched orders and list of
+        partially matched orders for each instrument with new orders."""
+        busy_connections = []
+        for connection, buffer in zip(self._connections, self._buffers):
+            if buffer:
+                connection.send(('round', dict(buffer)))
+                buffer.clear()
+                busy_connections.append(connection)
+        results = {}
+        self.rejected_orders = {}
+        for connection in busy_connections:
+            worker_results, rejected_orders = connection.recv()
+            results.update(worker_results)
+            self.rejected_orders.update(rejected_orders)
+        self.rejected += sum(map(len, self.rejected_orders.values()))
+        return results
+
+    def book_sizes(self) -> dict[str, int]:
+        """Method returns number of resting orders in each order book."""
+        sizes = {}
+        for connection in self._connections:
+            connection.send(('sizes', None))
+        for connection in self._connections:
+            sizes.update(connection.recv())
+        return sizes
+
+    def close(self) -> None:
+        """Method stops worker processes."""
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
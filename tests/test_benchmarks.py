@@ -0,0 +1,26 @@
+import json
+
+from benchmarks import run
+
+
+def test_benchmarks_run_writes_json_lines(tmp_path):
+    output = tmp_path / 'bench.jsonl'
+    run.main(['--depths', '200', '--rounds', '2', '--spreads', 'narrow',
+              '--output', str(output)])
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    benchmarks = {item['benchmark'] for item in results}
+    assert benchmarks == {
+        'get_random_orders',
+        'stream_random_orders',
+        'repository.add',
+        'repository.update',
+        'repository.get_by_field',
+        'repository.batch_remove',
+        'repository.peak_memory',
+        'order_book.match',
+    }
+    assert {item['backend'] for item in results if 'backend' in item} == (
+        set(run.BACKENDS))
+    for item in results:
+        if 'ops_per_sec' in item:
+            assert item['p50_us'] <= item['p99_us'] <= item['max_us']
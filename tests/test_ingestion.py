@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+from domain import models
+from repository.repository import PriceLevelOrderRepository
+from service.ingestion import AsyncOrderGateway
+
+
+def test_ingestion_gateway_matches_submitted_orders(orders_to_match):
+    async def scenario():
+        order_book = models.OrderBook(PriceLevelOrderRepository())
+        async with AsyncOrderGateway(order_book, max_queue_size=2,
+                                     batch_size=3) as gateway:
+            subscriber = gateway.subscribe()
+            await asyncio.gather(*(
+                gateway.submit(order)
+                for order in orders_to_match['orders']))
+        results = []
+        while not subscriber.empty():
+            results.append(subscriber.get_nowait())
+        return order_book, results
+
+    order_book, results = asyncio.run(scenario())
+    expected_book = models.OrderBook(PriceLevelOrderRepository())
+    expected_match, expected_partial = expected_book.batch_add_and_match(
+        orders_to_match['orders'])
+    assert len(results) > 1
+    assert [order for result in results for order in result[0]] == (
+        expected_match)
+    assert [(order.order_id, order.quantity)
+            for result in results for order in result[1]] == [
+        (order.order_id, order.quantity) for order in expected_partial]
+    assert ([(item.order_id, item.quantity)
+             for item in order_book.orders.orders.values()]
+            == [(item.order_id, item.quantity)
+                for item in expected_book.orders.orders.values()])
+
+
+def test_ingestion_gateway_accepts_orders_over_socket(valid_order_data):
+    async def scenario():
+        order_book = models.OrderBook(PriceLevelOrderRepository())
+        async with AsyncOrderGateway(order_book) as gateway:
+            host, port = await gateway.serve()
+            reader, writer = await asyncio.open_connection(host, port)
+            answers = []
+            for data in valid_order_data + [{'order_id': 'ggg'}]:
+                writer.write(json.dumps(data, default=str).encode() + b'\n')
+                await writer.drain()
+                answers.append(await reader.readline())
+            writer.close()
+            await writer.wait_closed()
+        return order_book, answers
+
+    order_book, answers = asyncio.run(scenario())
+    assert answers[:4] == [b'ok\n'] * 4
+    assert answers[4].startswith(b'error')
+    assert len(order_book.orders) == 1
+
+
+def test_ingestion_gateway_accepts_arrays_of_orders_over_socket(
+        valid_order_data):
+    async def scenario():
+        order_book = models.OrderBook(PriceLevelOrderRepository())
+        async with AsyncOrderGateway(order_book) as gateway:
+            host, port = await gateway.serve()
+            reader, writer = await asyncio.open_connection(host, port)
+            answers = []
+            for data in (valid_order_data[:2],
+                         valid_order_data[2:] + [{'order_id': 'ggg'}]):
+                writer.write(json.dumps(data, default=str).encode() + b'\n')
+                await writer.drain()
+                answers.append(await reader.readline())
+            writer.close()
+            await writer.wait_closed()
+        return order_book, answers
+
+    order_book, answers = asyncio.run(scenario())
+    assert answers[0] == b'ok\n'
+    assert answers[1].startswith(b'error 4')
+    assert len(order_book.orders) == 2
+
+
+def test_ingestion_gateway_skips_rejected_orders(valid_order_data):
+    async def scenario():
+        order_book = models.OrderBook(PriceLevelOrderRepository())
+        async with AsyncOrderGateway(order_book, max_queue_size=2,
+                                     batch_size=2) as gateway:
+            host, port = await gateway.serve()
+            reader, writer = await asyncio.open_connection(host, port)
+            answers = []
+            for data in ([{**valid_order_data[3], 'price': 10.005}]
+                         + valid_order_data[:2] + valid_order_data[:1]):
+                writer.write(json.dumps(data, default=str).encode() + b'\n')
+                await writer.drain()
+                answers.append(await reader.readline())
+            writer.close()
+            await writer.wait_closed()
+        return order_book, gateway, answers
+
+    order_book, gateway, answers = asyncio.run(
+        asyncio.wait_for(scenario(), 5))
+    assert answers == [b'ok\n'] * 4
+    assert gateway.rejected == 2
+    assert len(order_book.orders) == 2
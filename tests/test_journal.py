@@ -0,0 +1,101 @@
+import pytest
+
+from domain import models
+from orderflow.generators import stream_random_orders
+from repository.journal import OrderJournal, read_journal, replay_journal
+from repository.repository import (PriceLevelOrderRepository,
+                                   SimpleOrderRepository)
+
+
+def book_state(repository):
+    return sorted((item.order_id, item.order_type, item.quantity, item.price)
+                  for item in repository.get_by_field('order_type', 'buy')
+                  + repository.get_by_field('order_type', 'sell'))
+
+
+def test_journal_replay_rebuilds_order_book(tmp_path):
+    path = str(tmp_path / 'journal.bin')
+    order_book = models.OrderBook(
+        PriceLevelOrderRepository(), OrderJournal(path, fsync=False))
+    for order_list in stream_random_orders(50, seed=1, batches=5):
+        order_book.batch_add_and_match(order_list[:40])
+        for order in order_list[40:]:
+            order_book.add(order)
+        order_book.match()
+        order_book.commit()
+    order_book.journal.close()
+
+    for repository in (PriceLevelOrderRepository(), SimpleOrderRepository()):
+        replayed_book = replay_journal(path, models.OrderBook(repository))
+        assert book_state(replayed_book.orders) == book_state(
+            order_book.orders)
+
+
+def test_journal_replay_applies_only_committed_events(valid_orders,
+                                                      tmp_path):
+    path = str(tmp_path / 'journal.bin')
+    order_book = models.OrderBook(
+        SimpleOrderRepository(), OrderJournal(path, fsync=False))
+    for order in valid_orders:
+        order_book.add(order)
+    order_book.modify(valid_orders[0].with_quantity(1))
+    order_book.remove(valid_orders[1])
+    order_book.batch_remove(valid_orders[2:3])
+    order_book.commit()
+    order_book.remove(valid_orders[3])
+    order_book.journal._file.close()
+
+    assert len(list(read_journal(path))) == 1
+    replayed_book = replay_journal(
+        path, models.OrderBook(PriceLevelOrderRepository()))
+    assert book_state(replayed_book.orders) == [
+        (valid_orders[0].order_id, 'sell', 1, valid_orders[0].price),
+        (valid_orders[3].order_id, 'buy', 6, valid_orders[3].price),
+    ]
+
+
+def test_journal_cuts_uncommitted_events_on_open(valid_orders, tmp_path):
+    path = str(tmp_path / 'journal.bin')
+    journal = OrderJournal(path, fsync=False)
+    journal.add(valid_orders[0])
+    journal.commit()
+    journal.add(valid_orders[1])
+    journal._file.write(journal._buffer + b'torn')
+    journal._file.close()
+
+    journal = OrderJournal(path, fsync=False)
+    journal.add(valid_orders[2])
+    journal.close()
+
+    replayed_book = replay_journal(
+        path, models.OrderBook(PriceLevelOrderRepository()))
+    assert book_state(replayed_book.orders) == [
+        (valid_orders[0].order_id, 'sell', 5, valid_orders[0].price),
+        (valid_orders[2].order_id, 'buy', 1, valid_orders[2].price),
+    ]
+
+
+def test_journal_replay_restores_expiry_of_gtt_orders(valid_orders,
+                                                      tmp_path):
+    path = str(tmp_path / 'journal.bin')
+    order_book = models.OrderBook(
+        PriceLevelOrderRepository(), OrderJournal(path, fsync=False))
+    order_book.add(valid_orders[1].model_copy(
+        update={'time_in_force': 'GTT', 'expires_at': 150.0}))
+    order_book.journal.close()
+
+    replayed_book = replay_journal(path, models.OrderBook(
+        PriceLevelOrderRepository(), clock=lambda: 1000.0))
+    assert [order.order_id for order in replayed_book.expire()] == [
+        valid_orders[1].order_id]
+    assert len(replayed_book.orders) == 0
+
+
+def test_journal_rejects_file_of_unknown_format(tmp_path):
+    path = tmp_path / 'journal.bin'
+    path.write_bytes(bytes([1]) + bytes(39) + bytes([7]) + bytes(39))
+    with pytest.raises(ValueError):
+        OrderJournal(str(path), fsync=False)
+    with pytest.raises(ValueError):
+        list(read_journal(str(path)))
+    assert path.stat().st_size == 80
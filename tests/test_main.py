@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+import main
+from domain.models import OrderBook
+from orderflow.stochastic import StochasticOrderFlow
+from repository.repository import PriceLevelOrderRepository
+
+
+def test_main_headless_simulator_returns_stats(capsys):
+    order_book = OrderBook(PriceLevelOrderRepository())
+    stats = main.headless_simulator(
+        order_book, rounds=10, orders_per_round=50, seed=1, report_every=5)
+    assert stats['rounds'] == 10
+    assert stats['orders_added'] == 500
+    assert stats['orders_resting'] == len(order_book.orders)
+    assert stats['orders_matched'] > 0
+    assert len(capsys.readouterr().out.splitlines()) == 2
+
+
+def test_main_headless_simulator_is_reproducible_with_seed():
+    results = []
+    for _ in range(2):
+        stats = main.headless_simulator(
+            OrderBook(PriceLevelOrderRepository()),
+            rounds=5, orders_per_round=30, seed=7)
+        results.append((stats['orders_matched'], stats['orders_partial'],
+                        stats['orders_resting']))
+    assert results[0] == results[1]
+
+
+def test_main_headless_simulator_applies_cancels_of_flow():
+    order_book = OrderBook(PriceLevelOrderRepository())
+    batches = list(StochasticOrderFlow(seed=1, cancel_ratio=1.5).stream(
+        50, batches=10))
+    stats = main.headless_simulator(
+        order_book, rounds=10, orders_per_round=50, flow=iter(batches))
+
+    expected_book = OrderBook(PriceLevelOrderRepository())
+    resting_cancels = 0
+    for batch in batches:
+        resting_cancels += sum(
+            1 for order in batch.cancels
+            if expected_book.orders.get_by_field('order_id', order.order_id))
+        expected_book.batch_remove(batch.cancels)
+        expected_book.batch_add_and_match(batch.orders)
+    assert stats['orders_added'] == 500
+    assert sum(len(batch.cancels) for batch in batches) > resting_cancels
+    assert stats['orders_cancelled'] == resting_cancels > 0
+    assert stats['orders_resting'] == len(order_book.orders)
+    assert stats['orders_resting'] == len(expected_book.orders)
+
+
+def test_main_rejects_negative_cancel_ratio():
+    with pytest.raises(SystemExit):
+        main.parse_args(['--cancel-ratio', '-1'])
+
+
+def test_main_closes_repository_when_simulation_fails(monkeypatch):
+    closed = []
+    close = main.TieredOrderRepository.close
+
+    def record_close(repository):
+        closed.append(repository.path)
+        close(repository)
+
+    def fail(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(main.TieredOrderRepository, 'close', record_close)
+    monkeypatch.setattr(main, 'market_simulator', fail)
+    with pytest.raises(KeyboardInterrupt):
+        main.main(['--max-orders', '10'])
+    assert len(closed) == 1
+    assert not os.path.exists(closed[0])
+
+
+def test_main_passes_ttl_to_stochastic_flow(monkeypatch):
+    flows = []
+
+    def record_headless(order_book, **kwargs):
+        flows.append(next(kwargs['flow']))
+        return {}
+
+    monkeypatch.setattr(main, 'headless_simulator', record_headless)
+    monkeypatch.setattr(main, 'print_stats_message', lambda stats: None)
+    main.main(['--headless', '--flow', 'stochastic', '--ttl', '2'])
+    assert {order.time_in_force for order in flows[0].orders} == {'GTT'}
+
+
+def test_main_rejects_database_with_journal(tmp_path):
+    with pytest.raises(SystemExit):
+        main.parse_args(['--database', str(tmp_path / 'book.sqlite'),
+                         '--journal', str(tmp_path / 'book.journal')])
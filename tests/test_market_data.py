@@ -0,0 +1,55 @@
+import pytest
+
+from domain import models
+from orderflow.generators import stream_random_orders
+from repository.repository import (AbstractOrderRepository,
+                                   PriceLevelOrderRepository,
+                                   SimpleOrderRepository)
+from repository.sqlite_repository import SQLiteOrderRepository
+from service.market_data import MarketDataFeed
+
+
+@pytest.mark.parametrize('repository_class', [SimpleOrderRepository,
+                                              PriceLevelOrderRepository,
+                                              SQLiteOrderRepository])
+def test_market_data_feed_publishes_changes_of_rounds(repository_class,
+                                                      orders_to_match):
+    order_book = models.OrderBook(repository_class())
+    feed = MarketDataFeed(order_book)
+    updates = []
+    feed.subscribe(updates.append)
+    for order in orders_to_match['orders']:
+        order_book.add(order)
+    feed.end_round()
+    order_book.match()
+    feed.end_round()
+    feed.end_round()
+
+    assert updates[0] == {
+        'round': 1,
+        'buy': [(233.4, 6), (17, 1)],
+        'sell': [(15, 3), (30, 5)],
+        'top_of_book': {'bid': 233.4, 'bid_quantity': 6,
+                        'ask': 15, 'ask_quantity': 3},
+    }
+    assert updates[1] == {
+        'round': 2,
+        'buy': [(233.4, 0)],
+        'sell': [(15, 0), (30, 2)],
+        'top_of_book': {'bid': 17, 'bid_quantity': 1,
+                        'ask': 30, 'ask_quantity': 2},
+    }
+    assert updates[2] == {'round': 3, 'buy': [], 'sell': []}
+    assert feed.depth() == {'buy': [(17, 1)], 'sell': [(30, 2)]}
+
+
+@pytest.mark.parametrize('repository_class', [SimpleOrderRepository,
+                                              PriceLevelOrderRepository])
+def test_market_data_depth_is_maintained_incrementally(repository_class):
+    repository = repository_class()
+    order_book = models.OrderBook(repository)
+    for order_list in stream_random_orders(200, seed=3, batches=20):
+        order_book.batch_add_and_match(order_list)
+        for order_type in ('buy', 'sell'):
+            assert repository.get_depth(order_type, 5) == (
+                AbstractOrderRepository._get_depth(repository, order_type, 5))
@@ -0,0 +1,52 @@
+import json
+
+from domain import models
+from orderflow.generators import stream_random_orders
+from repository.repository import PriceLevelOrderRepository
+from service import metrics
+
+
+def test_metrics_latency_histogram_percentiles():
+    histogram = metrics.LatencyHistogram()
+    for duration in [2e-6] * 90 + [2e-3] * 10:
+        histogram.record(duration)
+    assert histogram.count == 100
+    assert 2e-6 <= histogram.percentile(0.5) < 1e-5
+    assert 2e-3 <= histogram.percentile(0.99) < 1e-2
+
+
+def test_metrics_recorder_records_instrumented_rounds(orders_to_match,
+                                                      tmp_path):
+    recorder = metrics.MetricsRecorder()
+    order_book = metrics.instrument_order_book(
+        models.OrderBook(PriceLevelOrderRepository()), recorder)
+    for order in orders_to_match['orders']:
+        order_book.add(order)
+    order_book.match()
+    round_metrics = recorder.end_round(order_book)
+    batches = metrics.instrument_generator(
+        stream_random_orders(10, seed=1, batches=2), recorder)
+    for order_list in batches:
+        order_book.batch_add_and_match(order_list)
+        recorder.end_round(order_book)
+
+    assert round_metrics['depth_buy'] == 1
+    assert round_metrics['depth_sell'] == 1
+    assert round_metrics['spread'] == 13
+    result = recorder.to_dict()
+    assert result['rounds'] == 3
+    assert result['orders_generated'] == 20
+    assert result['latency']['repository.add']['count'] >= 4
+    assert result['latency']['order_book.match']['count'] == 1
+    assert result['latency']['order_book.add_and_match']['count'] == 20
+    assert result['latency']['generate_orders']['count'] == 2
+
+    with open(tmp_path / 'metrics.jsonl', 'w') as file:
+        recorder.write_json_line(file)
+    assert json.loads((tmp_path / 'metrics.jsonl').read_text())[
+        'rounds'] == 3
+    recorder.write_prometheus(str(tmp_path / 'metrics.prom'))
+    text = (tmp_path / 'metrics.prom').read_text()
+    assert 'market_rounds_total 3' in text
+    assert ('market_latency_seconds_count{call="order_book.match"} 1'
+            in text)
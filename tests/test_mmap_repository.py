@@ -0,0 +1,93 @@
+from uuid import uuid4
+
+from domain import models
+from repository.mmap_repository import HEADER, MAGIC, MmapOrderRepository
+
+
+def test_rep_order_mmap_rep_restores_orders_after_restart(valid_orders,
+                                                          tmp_path):
+    path = str(tmp_path / 'book.bin')
+    repository = MmapOrderRepository(path, capacity=2)
+    same_price_order = valid_orders[2].model_copy(
+        update={'order_id': uuid4()})
+    for order in valid_orders + [same_price_order]:
+        repository.add(order)
+    repository.update(valid_orders[2].with_quantity(7))
+    repository.remove(valid_orders[0])
+    repository.close()
+
+    repository = MmapOrderRepository(path)
+    assert len(repository) == 4
+    assert repository.get_by_field(
+        field='order_type',
+        value='buy',
+        sort_field='price',
+        reverse_sorting=True,
+    ) == [valid_orders[3], valid_orders[2], same_price_order]
+    assert repository.get_best('buy').price == valid_orders[3].price
+    restored = repository.get_by_field('order_id', valid_orders[2].order_id)
+    assert restored[0].quantity == 7
+    assert restored[0].timestamp == valid_orders[2].timestamp
+    repository.close()
+
+
+def test_rep_order_mmap_rep_reuses_free_slots(valid_orders, tmp_path):
+    path = tmp_path / 'book.bin'
+    repository = MmapOrderRepository(str(path), capacity=4)
+    for order in valid_orders:
+        repository.add(order)
+    size = path.stat().st_size
+    repository.batch_remove(valid_orders[:2])
+    for order in valid_orders[:2]:
+        repository.add(order.model_copy(update={'order_id': uuid4()}))
+    repository.flush()
+    assert path.stat().st_size == size
+    repository.add(valid_orders[0])
+    repository.flush()
+    assert path.stat().st_size > size
+    repository.close()
+
+
+def test_rep_order_mmap_rep_keeps_book_after_match(orders_to_match,
+                                                   tmp_path):
+    path = str(tmp_path / 'book.bin')
+    order_book = models.OrderBook(MmapOrderRepository(path))
+    for order in orders_to_match['orders']:
+        order_book.add(order)
+    order_book.match()
+    order_book.orders.close()
+
+    repository = MmapOrderRepository(path)
+    unmatched = sorted(models.as_order(item)
+                       for item in repository.orders.values())
+    assert unmatched == sorted(orders_to_match['exp_unmatched'])
+    assert [order.quantity for order in unmatched] == [2, 1]
+    repository.close()
+
+
+def test_rep_order_mmap_rep_restores_expiry_of_gtt_orders(valid_orders,
+                                                          tmp_path):
+    path = str(tmp_path / 'book.bin')
+    repository = MmapOrderRepository(path)
+    models.OrderBook(repository).add(valid_orders[1].model_copy(
+        update={'time_in_force': 'GTT', 'expires_at': 150.0}))
+    repository.close()
+
+    repository = MmapOrderRepository(path)
+    order_book = models.OrderBook(repository, clock=lambda: 1000.0)
+    assert [order.order_id for order in order_book.expire()] == [
+        valid_orders[1].order_id]
+    assert len(repository) == 0
+    repository.close()
+
+
+def test_rep_order_mmap_rep_flushes_round_on_commit(valid_orders, tmp_path):
+    path = tmp_path / 'book.bin'
+    repository = MmapOrderRepository(str(path))
+    order_book = models.OrderBook(repository)
+    for order in valid_orders:
+        order_book.add(order)
+    assert HEADER.unpack_from(path.read_bytes())[1] == 0
+    order_book.commit()
+    assert HEADER.unpack_from(path.read_bytes()) == (MAGIC, 4)
+    repository.close()
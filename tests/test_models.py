@@ -1,6 +1,13 @@
+import time
+
 import pytest
+from pydantic import ValidationError
 
 from domain import models
+from repository.repository import (PriceLevelOrderRepository,
+                                   RepAlreadyExistsError,
+                                   RepInvalidPriceError,
+                                   SimpleOrderRepository)
 
 
 def test_models_order_is_created_with_valid_data(valid_order_data):
@@ -12,6 +19,13 @@ def test_models_order_is_created_with_valid_data(valid_order_data):
             assert output_data[name] == input_data[name], f'{input_data}'
 
 
+def test_models_order_gets_timestamp_of_its_creation(valid_order_data):
+    first_order = models.Order(**valid_order_data[2])
+    time.sleep(0.001)
+    second_order = models.Order(**valid_order_data[2])
+    assert second_order.timestamp > first_order.timestamp
+
+
 def test_models_order_is_not_created_with_invalid_data(invalid_order_data):
     for input_data in invalid_order_data:
         with pytest.raises(Exception):
@@ -71,3 +85,183 @@ def test_rep_order_simple_rep_matches_orders_correctly(orders_to_match,
 
     assert (sorted(test_repository.orders)
             == sorted(orders_to_match['exp_unmatched']))
+
+
+def test_models_order_book_matches_price_level_rep_correctly(
+        orders_to_match):
+    repository = PriceLevelOrderRepository()
+    order_book = models.OrderBook(repository)
+    for order in orders_to_match['orders']:
+        order_book.add(order)
+
+    match, partial = order_book.match()
+
+    assert sorted(match) == sorted(orders_to_match['exp_match'])
+    assert sorted(partial) == sorted(orders_to_match['exp_partial'])
+    assert [order.quantity for order in partial] == [3]
+    unmatched = sorted(models.as_order(item)
+                       for item in repository.orders.values())
+    assert unmatched == sorted(orders_to_match['exp_unmatched'])
+    assert ([order.quantity for order in unmatched]
+            == [2, 1])
+
+
+def test_models_order_book_adds_and_matches_order_correctly(
+        orders_to_match):
+    repository = PriceLevelOrderRepository()
+    order_book = models.OrderBook(repository)
+    resting_orders = orders_to_match['orders'][:3]
+    incoming_order = orders_to_match['orders'][3]
+    for order in resting_orders:
+        order_book.add(order)
+
+    match, partial = order_book.add_and_match(incoming_order)
+
+    assert sorted(match) == sorted(orders_to_match['exp_match'])
+    assert sorted(partial) == sorted(orders_to_match['exp_partial'])
+    assert [order.quantity for order in partial] == [3]
+    unmatched = sorted(models.as_order(item)
+                       for item in repository.orders.values())
+    assert unmatched == sorted(orders_to_match['exp_unmatched'])
+    assert [order.quantity for order in unmatched] == [2, 1]
+
+
+def test_models_order_book_rests_partially_matched_incoming_order(
+        valid_orders):
+    repository = PriceLevelOrderRepository()
+    order_book = models.OrderBook(repository)
+    incoming_order = valid_orders[2].model_copy(
+        update={'quantity': 10})
+
+    match, partial = order_book.batch_add_and_match(
+        [valid_orders[1], incoming_order])
+
+    assert match == [valid_orders[1]]
+    assert partial == [incoming_order]
+    assert partial[0].quantity == 3
+    assert repository.get_best('sell') is None
+    assert repository.get_best('buy').quantity == 7
+
+
+@pytest.mark.parametrize('repository_class', [SimpleOrderRepository,
+                                              PriceLevelOrderRepository])
+@pytest.mark.parametrize('quantity', [2, 10])
+def test_models_order_book_rejects_duplicate_before_matching(
+        repository_class, quantity, valid_orders):
+    repository = repository_class()
+    order_book = models.OrderBook(repository)
+    order_book.add(valid_orders[1])
+    order_book.add(valid_orders[2])
+    duplicate_order = valid_orders[2].model_copy(
+        update={'quantity': quantity, 'price': 20})
+
+    with pytest.raises(RepAlreadyExistsError):
+        order_book.add_and_match(duplicate_order)
+
+    assert len(repository) == 2
+    assert repository.get_best('sell') == valid_orders[1]
+
+
+def test_models_order_book_rejects_price_out_of_tick_before_matching(
+        valid_orders):
+    repository = PriceLevelOrderRepository()
+    order_book = models.OrderBook(repository)
+    order_book.add(valid_orders[1])
+    incoming_order = valid_orders[3].model_copy(update={'price': 15.005})
+
+    with pytest.raises(RepInvalidPriceError):
+        order_book.add_and_match(incoming_order)
+
+    assert repository.get_depth('sell') == [(15, 3)]
+    assert repository.get_best('buy') is None
+
+
+def test_models_order_requires_expiry_for_gtt_only(valid_order_data):
+    with pytest.raises(ValueError):
+        models.Order(**valid_order_data[0], time_in_force='GTT')
+    with pytest.raises(ValueError):
+        models.Order(**valid_order_data[0], expires_at=100)
+    order = models.Order(**valid_order_data[0], time_in_force='GTT',
+                         expires_at=100)
+    assert models.OrderRecord.from_order(order).to_order().expires_at == 100
+
+
+def test_models_order_book_expires_gtt_orders_lazily(valid_orders):
+    now = [100.0]
+    repository = PriceLevelOrderRepository()
+    order_book = models.OrderBook(repository, clock=lambda: now[0])
+    expiring_order = valid_orders[1].model_copy(
+        update={'time_in_force': 'GTT', 'expires_at': 150.0})
+    order_book.add(expiring_order)
+    order_book.add(valid_orders[0])
+    order_book.add(valid_orders[2].model_copy(
+        update={'time_in_force': 'GTT', 'expires_at': 120.0}))
+    order_book.remove(valid_orders[2])
+    assert order_book.expire() == []
+
+    now[0] = 200.0
+    incoming_order = valid_orders[3].model_copy(update={'quantity': 1})
+    match, partial = order_book.add_and_match(incoming_order)
+
+    assert order_book.expire() == []
+    assert match == [incoming_order] and partial == [valid_orders[0]]
+    assert len(repository) == 1
+    assert repository.get_best('sell').quantity == 4
+
+
+def test_models_order_book_cancels_ioc_and_fok_orders(valid_orders):
+    repository = PriceLevelOrderRepository()
+    order_book = models.OrderBook(repository)
+    order_book.add(valid_orders[1])
+    fok_order = valid_orders[3].model_copy(update={'time_in_force': 'FOK'})
+    ioc_order = valid_orders[3].model_copy(update={'time_in_force': 'IOC'})
+
+    assert order_book.add_and_match(fok_order) == ([], [])
+    assert len(repository) == 1
+    match, partial = order_book.add_and_match(ioc_order)
+
+    assert match == [valid_orders[1]]
+    assert [order.quantity for order in partial] == [3]
+    assert len(repository) == 0
+    with pytest.raises(ValueError):
+        order_book.add(ioc_order)
+
+
+@pytest.mark.parametrize('batch_size', [1, 1024])
+def test_models_order_book_streams_trades(orders_to_match, batch_size):
+    repository = PriceLevelOrderRepository()
+    order_book = models.OrderBook(repository)
+    for order in orders_to_match['orders']:
+        order_book.add(order)
+    sell_ids = [order.order_id for order in orders_to_match['orders'][:2]]
+    buy_id = orders_to_match['orders'][3].order_id
+
+    batches = list(order_book.iter_trade_batches(batch_size))
+
+    assert [trade for batch in batches for trade in batch] == [
+        models.Trade(buy_id, sell_ids[1], 3, 233.40),
+        models.Trade(buy_id, sell_ids[0], 3, 233.40),
+    ]
+    assert len(batches) == (2 if batch_size == 1 else 1)
+    unmatched = sorted(models.as_order(item)
+                       for item in repository.orders.values())
+    assert unmatched == sorted(orders_to_match['exp_unmatched'])
+    assert [order.quantity for order in unmatched] == [2, 1]
+    assert list(order_book.iter_trades()) == []
+
+
+def test_models_trusted_order_equals_validated_order(valid_order_data):
+    order = models.Order(**valid_order_data[0])
+    trusted_order = models.Order.trusted(**valid_order_data[0])
+    assert trusted_order.model_dump() == order.model_dump()
+    assert trusted_order.with_quantity(1).quantity == 1
+    assert trusted_order.quantity == order.quantity
+
+
+def test_models_orders_are_validated_in_batch(valid_order_data,
+                                              invalid_order_data):
+    orders = models.validate_orders(valid_order_data)
+    assert orders == [models.Order(**item) for item in valid_order_data]
+    with pytest.raises(ValidationError) as error:
+        models.validate_orders(valid_order_data + invalid_order_data)
+    assert error.value.error_count() == len(invalid_order_data)
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from domain.models import Order
+from orderflow import generators
+from orderflow.stochastic import StochasticOrderFlow
+
+
+def test_orderflow_random_order_columns_are_valid():
+    columns = generators.random_order_columns(
+        1000, np.random.default_rng(0))
+    orders = generators.columns_to_orders(columns)
+    assert len(orders) == 1000
+    assert len({order.order_id for order in orders}) == 1000
+    for order in orders:
+        assert order.order_id.version == 4
+        assert Order(**order.model_dump()) == order
+        assert 1 <= order.quantity <= 500
+        assert 0.1 <= order.price <= 100
+    assert {order.order_type for order in orders} == {'buy', 'sell'}
+
+
+def test_orderflow_stream_random_orders_is_reproducible_with_seed():
+    first = list(generators.stream_random_orders(50, seed=3, batches=3))
+    second = list(generators.stream_random_orders(50, seed=3, batches=3))
+    assert [len(batch) for batch in first] == [50, 50, 50]
+    for first_batch, second_batch in zip(first, second):
+        assert ([(order.order_id, order.price, order.quantity)
+                 for order in first_batch]
+                == [(order.order_id, order.price, order.quantity)
+                    for order in second_batch])
+
+
+def test_orderflow_stochastic_flow_is_realistic_and_reproducible():
+    first = StochasticOrderFlow(seed=7, cancel_ratio=0.5, start_time=1000)
+    second = StochasticOrderFlow(seed=7, cancel_ratio=0.5, start_time=1000)
+    batches = list(first.stream(500, batches=4))
+    assert batches == list(second.stream(500, batches=4))
+
+    orders = [order for batch in batches for order in batch.orders]
+    cancels = [order for batch in batches for order in batch.cancels]
+    timestamps = [order.timestamp for order in orders]
+    assert timestamps == sorted(timestamps)
+    assert 1.5 < timestamps[-1] - 1000 < 2.5
+    assert all(abs(order.price - 50) < 5 for order in orders)
+    quantities = sorted(order.quantity for order in orders)
+    assert quantities[0] >= 1 and quantities[-1] > 20 * quantities[1000]
+    assert 500 < len(cancels) < 1000
+    assert len(set(cancels)) == len(cancels)
+    assert set(cancels) <= set(orders)
+    assert not set(batches[0].cancels)
+
+
+def test_orderflow_stochastic_flow_orders_expire_after_ttl():
+    flow = StochasticOrderFlow(seed=7, start_time=1000, ttl=0.5)
+    orders = flow.next_batch(100).orders
+    assert {order.time_in_force for order in orders} == {'GTT'}
+    assert all(order.expires_at == order.timestamp + 0.5
+               for order in orders)
+
+
+def test_orderflow_stochastic_flow_draws_more_cancels_than_orders():
+    flow = StochasticOrderFlow(seed=7, cancel_ratio=1.5, start_time=1000)
+    list(flow.stream(100, batches=2))
+    assert len(flow.next_batch(10).cancels) > 10
+    with pytest.raises(ValueError):
+        StochasticOrderFlow(cancel_ratio=-1)
@@ -0,0 +1,62 @@
+import pytest
+
+from domain import models
+from orderflow import replay
+from orderflow.generators import stream_random_orders
+from repository.repository import PriceLevelOrderRepository
+
+
+@pytest.fixture(scope='function')
+def recorded_orders():
+    return [order for order_list in stream_random_orders(
+        100, seed=5, batches=5, ttl=1) for order in order_list]
+
+
+@pytest.mark.parametrize('suffix', ['csv', 'npy'])
+def test_replay_reads_recorded_flow_in_chunks(recorded_orders, tmp_path,
+                                              suffix):
+    path = str(tmp_path / f'flow.{suffix}')
+    assert replay.write_flow(path, recorded_orders) == 500
+
+    chunks = list(replay.iter_flow(path, chunk_size=200))
+
+    assert [len(chunk) for chunk in chunks] == [200, 200, 100]
+    orders = [order for chunk in chunks for order in chunk]
+    assert ([order.model_dump() for order in orders]
+            == [order.model_dump() for order in recorded_orders])
+
+
+def test_replay_matches_flow_like_live_order_book(recorded_orders,
+                                                  tmp_path):
+    path = str(tmp_path / 'flow.npy')
+    replay.write_flow(path, recorded_orders)
+    order_book = models.OrderBook(PriceLevelOrderRepository())
+
+    stats = replay.replay(path, order_book, chunk_size=64)
+
+    expected_book = models.OrderBook(PriceLevelOrderRepository(),
+                                     clock=lambda: 0)
+    matched, partial = expected_book.batch_add_and_match(recorded_orders)
+    assert stats['orders'] == 500
+    assert stats['orders_matched'] == len(matched)
+    assert stats['orders_partial'] == len(partial)
+    assert stats['orders_resting'] == len(expected_book.orders)
+
+
+def test_replay_sweeps_scenarios_in_parallel(recorded_orders, tmp_path):
+    path = str(tmp_path / 'flow.csv')
+    replay.write_flow(path, recorded_orders)
+    scenarios = [
+        {'path': path, 'backend': 'simple'},
+        {'path': path, 'backend': 'price_level', 'tick_size': 0.01},
+        {'path': path, 'backend': 'price_level', 'tick_size': 0.05},
+    ]
+
+    result = replay.sweep(scenarios, workers=2)
+
+    assert result['orders'] == 1500
+    assert [item['backend'] for item in result['scenarios']] == [
+        'simple', 'price_level', 'price_level']
+    assert len({item['orders_matched']
+                for item in result['scenarios'][:2]}) == 1
+    assert result['scenarios'][2]['orders_matched'] > 0
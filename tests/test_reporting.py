@@ -0,0 +1,54 @@
+import io
+import threading
+import time
+
+from service.reporting import ReportWriter, format_round_report
+
+
+def test_reporting_format_round_report_lists_or_counts_orders():
+    report = format_round_report(3, 5, ['buy_1_2.0_x'], [], 4)
+    assert report.startswith('Round 3\n')
+    assert 'buy_1_2.0_x\n' in report
+    assert 'Orders matched in full: 1\n' in report
+    summary = format_round_report(3, 5, 1, 0, 4)
+    assert 'Matched orders' not in summary
+    assert 'Orders matched in full: 1\n' in summary
+
+
+def test_reporting_writer_samples_rounds_in_background():
+    output = io.StringIO()
+    with ReportWriter(output, verbosity='summary', sample_every=2) as writer:
+        for market_round in range(1, 11):
+            writer.submit(market_round, 20, ['order'] * 3, [], 17)
+    text = output.getvalue()
+    assert text.count('Round ') == 5
+    assert 'Round 10\n' in text and 'Round 9\n' not in text
+    assert "order\n" not in text
+
+
+def test_reporting_writer_does_not_stall_on_slow_output():
+    release = threading.Event()
+
+    class SlowOutput(io.StringIO):
+        def write(self, text):
+            release.wait()
+            return super().write(text)
+
+    output = SlowOutput()
+    writer = ReportWriter(output, max_queue_size=5)
+    start = time.perf_counter()
+    for market_round in range(1, 101):
+        writer.submit(market_round, 20, [], [], 17)
+    assert time.perf_counter() - start < 0.5
+    release.set()
+    writer.close()
+    assert writer.dropped > 0
+    assert output.getvalue().count('Round ') == 100 - writer.dropped
+
+
+def test_reporting_writer_rotates_report_file(tmp_path):
+    path = str(tmp_path / 'rounds.log')
+    with ReportWriter(path, max_bytes=1000, backup_count=2) as writer:
+        for market_round in range(1, 51):
+            writer.submit(market_round, 20, [], [], 17)
+    assert (tmp_path / 'rounds.log.1').exists()
@@ -1,4 +1,11 @@
-from repository.repository import SimpleOrderRepository
+from uuid import uuid4
+
+import pytest
+
+from domain.models import OrderRecord
+from repository.repository import (PriceLevelOrderRepository,
+                                   RepInvalidPriceError, RepNotFoundError,
+                                   SimpleOrderRepository)
 
 
 def test_rep_order_simple_rep_adds_order_correctly(valid_orders):
@@ -80,3 +87,168 @@ def test_rep_order_simple_rep_gets_orders_correctly(valid_orders):
                 == sell_orders_asc[idx].quantity)
         assert (retrieved_sell_orders[idx].price
                 == sell_orders_asc[idx].price)
+
+
+def test_rep_order_price_level_rep_adds_order_correctly(valid_orders):
+    repository = PriceLevelOrderRepository()
+    for order in valid_orders:
+        repository.add(order)
+    assert len(repository) == len(valid_orders)
+    for order in valid_orders:
+        record = repository.orders[order.order_id.int]
+        assert record.to_order() == order
+        assert record.quantity == order.quantity
+
+
+def test_rep_order_price_level_rep_udates_order_correctly(valid_orders):
+    repository = PriceLevelOrderRepository()
+    for order in valid_orders:
+        repository.add(order)
+    order_to_change = valid_orders[0].model_copy(update={'price': 1})
+    repository.update(order_to_change)
+    best_sell = repository.get_best('sell')
+    assert best_sell == order_to_change
+    assert best_sell.price == 1
+
+
+def test_rep_order_price_level_rep_removes_order_correctly(valid_orders):
+    repository = PriceLevelOrderRepository()
+    for order in valid_orders:
+        repository.add(order)
+    repository.batch_remove(valid_orders[:2])
+    repository.remove(valid_orders[-1])
+    assert len(repository) == 1
+    assert repository.get_best('sell') is None
+    assert repository.get_best('buy') == valid_orders[2]
+
+
+def test_rep_order_price_level_rep_gets_orders_correctly(valid_orders):
+    repository = PriceLevelOrderRepository()
+    same_price_order = valid_orders[2].model_copy(
+        update={'order_id': uuid4()})
+    for order in valid_orders + [same_price_order]:
+        repository.add(order)
+    retrieved_buy_orders = repository.get_by_field(
+        field='order_type',
+        value='buy',
+        sort_field='price',
+        reverse_sorting=True,
+    )
+    retrieved_sell_orders = repository.get_by_field(
+        field='order_type',
+        value='sell',
+        sort_field='price',
+        reverse_sorting=False,
+    )
+    assert retrieved_buy_orders == [
+        valid_orders[3], valid_orders[2], same_price_order]
+    assert retrieved_sell_orders == [valid_orders[1], valid_orders[0]]
+    assert repository.get_best('buy') == valid_orders[3]
+    assert repository.get_best('sell') == valid_orders[1]
+
+
+def test_rep_order_price_level_rep_iterates_records_correctly(valid_orders):
+    repository = PriceLevelOrderRepository()
+    for order in valid_orders:
+        repository.add(order)
+    records = list(repository.iter_records('sell'))
+    assert all(isinstance(item, OrderRecord) for item in records)
+    assert ([item.order_id for item in records]
+            == [valid_orders[1].order_id, valid_orders[0].order_id])
+    repository.update(records[0].with_quantity(1))
+    repository.batch_remove(records[1:])
+    assert repository.get_by_field('order_type', 'sell') == [valid_orders[1]]
+    assert repository.get_best('sell').quantity == 1
+
+
+def test_rep_order_reps_apply_changes_correctly(valid_orders):
+    for repository in (SimpleOrderRepository(), PriceLevelOrderRepository()):
+        for order in valid_orders:
+            repository.add(order)
+        updated_order = valid_orders[0].with_quantity(1)
+        repository.apply_changes(
+            removed=valid_orders[2:] + [valid_orders[2]],
+            updated=[updated_order],
+        )
+        assert len(repository) == 2
+        assert repository.get_by_field(
+            'order_id', updated_order.order_id)[0].quantity == 1
+
+
+def test_rep_order_reps_apply_no_changes_if_update_not_found(valid_orders):
+    for repository in (SimpleOrderRepository(), PriceLevelOrderRepository()):
+        for order in valid_orders[:3]:
+            repository.add(order)
+        with pytest.raises(RepNotFoundError):
+            repository.apply_changes(
+                removed=valid_orders[:2],
+                updated=[valid_orders[3]],
+            )
+        assert len(repository) == 3
+
+
+def test_rep_order_price_level_rep_keeps_price_time_priority(valid_orders):
+    repository = PriceLevelOrderRepository()
+    orders = [valid_orders[0].model_copy(update={'order_id': uuid4()})
+              for _ in range(3)]
+    for order in orders:
+        repository.add(order)
+    repository.update(orders[0].with_quantity(1))
+    assert repository.get_by_field('order_type', 'sell', 'price') == orders
+    repository.update(orders[0].model_copy(update={'price': 31}))
+    repository.update(orders[0].model_copy(update={'price': 30}))
+    assert repository.get_by_field('order_type', 'sell', 'price') == [
+        orders[1], orders[2], orders[0]]
+    sequences = [record.sequence for record in repository.iter_records('sell')]
+    assert sequences == sorted(sequences)
+    assert {record.ticks for record in repository.iter_records('sell')} == {
+        3000}
+
+
+def test_rep_order_price_level_rep_rejects_price_out_of_tick(valid_orders):
+    repository = PriceLevelOrderRepository(tick_size=0.5)
+    repository.add(valid_orders[0])
+    with pytest.raises(RepInvalidPriceError):
+        repository.add(valid_orders[3])
+    assert len(repository) == 1
+
+
+def test_rep_order_simple_rep_keeps_time_priority(valid_orders):
+    repository = SimpleOrderRepository()
+    orders = [valid_orders[2].model_copy(update={'order_id': uuid4()})
+              for _ in range(5)]
+    for order in orders:
+        repository.add(order)
+    assert repository.get_by_field('order_type', 'buy', 'price', True) == (
+        orders)
+
+
+def test_rep_order_simple_rep_keeps_indexes_up_to_date(valid_orders):
+    repository = SimpleOrderRepository(sorted_indexes=('price', 'timestamp'))
+    for order in valid_orders:
+        repository.add(order)
+    repository.update(valid_orders[0].model_copy(update={'price': 10}))
+    repository.remove(valid_orders[3])
+    price_index = repository.indexes['price']
+    assert price_index.sorted_values == {'buy': [17], 'sell': [10, 15]}
+    assert repository.count('buy') == 1
+    assert repository.get_by_field('order_type', 'sell', 'price') == [
+        valid_orders[0].model_copy(update={'price': 10}), valid_orders[1]]
+    repository.batch_remove(valid_orders[:2])
+    assert repository.indexes['timestamp'].sorted_values == {
+        'buy': [valid_orders[2].timestamp]}
+
+
+@pytest.mark.parametrize('repository_class', [SimpleOrderRepository,
+                                              PriceLevelOrderRepository])
+def test_rep_order_rep_gets_orders_by_range(repository_class, valid_orders):
+    repository = repository_class()
+    for order in valid_orders:
+        repository.add(order)
+    assert repository.get_by_range('price', lower=17, order_type='buy') == [
+        valid_orders[2], valid_orders[3]]
+    assert repository.get_by_range('price', 15, 30, True) == [
+        valid_orders[0], valid_orders[2], valid_orders[1]]
+    assert repository.get_by_range('price', upper=14) == []
+    assert repository.get_by_range('quantity', 3, 5) == [
+        valid_orders[1], valid_orders[0]]
@@ -0,0 +1,54 @@
+from uuid import uuid4
+
+from domain import models
+from orderflow.generators import stream_random_orders
+from repository.repository import PriceLevelOrderRepository
+from service.router import MarketRouter
+
+SYMBOLS = ['AAA', 'BBB', 'CCC', 'DDD']
+
+
+def test_router_matches_each_instrument_separately():
+    order_batches = list(stream_random_orders(
+        200, seed=5, batches=3, symbols=SYMBOLS))
+    books = {symbol: models.OrderBook(PriceLevelOrderRepository())
+             for symbol in SYMBOLS}
+    with MarketRouter(workers=2) as router:
+        for order_list in order_batches:
+            router.submit(order_list)
+            results = router.match_round()
+            assert set(results) == set(SYMBOLS)
+            for symbol, (match, partial) in results.items():
+                expected_match, expected_partial = (
+                    books[symbol].batch_add_and_match(
+                        [order for order in order_list
+                         if order.symbol == symbol]))
+                assert match == expected_match
+                assert ([order.quantity for order in partial]
+                        == [order.quantity for order in expected_partial])
+                assert all(order.symbol == symbol
+                           for order in match + partial)
+        assert router.book_sizes() == {
+            symbol: len(book.orders) for symbol, book in books.items()}
+
+
+def test_router_shards_instruments_stably():
+    with MarketRouter(workers=3) as router:
+        shards = [router.shard(symbol) for symbol in SYMBOLS]
+        assert shards == [router.shard(symbol) for symbol in SYMBOLS]
+        assert all(0 <= shard < 3 for shard in shards)
+        assert router.match_round() == {}
+
+
+def test_router_skips_orders_rejected_by_books(valid_orders):
+    off_tick_order = valid_orders[0].model_copy(
+        update={'order_id': uuid4(), 'price': 1.005})
+    with MarketRouter(workers=1) as router:
+        router.submit(valid_orders[:2] + [off_tick_order])
+        router.match_round()
+        router.submit([valid_orders[1], valid_orders[2]])
+        matched, _ = router.match_round()['DEFAULT']
+        assert router.rejected == 2
+        assert router.rejected_orders == {'DEFAULT': [valid_orders[1]]}
+        assert matched == [valid_orders[2]]
+        assert router.book_sizes() == {'DEFAULT': 2}
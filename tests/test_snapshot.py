@@ -0,0 +1,63 @@
+from uuid import uuid4
+
+from domain import models
+from orderflow.generators import stream_random_orders
+from repository.repository import (PriceLevelOrderRepository,
+                                   SimpleOrderRepository)
+
+
+def test_snapshot_restores_order_book(valid_orders, tmp_path):
+    path = str(tmp_path / 'book.npy')
+    order_book = models.OrderBook(PriceLevelOrderRepository())
+    same_price_order = valid_orders[2].model_copy(
+        update={'order_id': uuid4()})
+    for order in valid_orders + [same_price_order]:
+        order_book.add(order)
+    assert order_book.snapshot(path) == 5
+
+    for repository in (PriceLevelOrderRepository(), SimpleOrderRepository()):
+        restored_book = models.OrderBook(repository)
+        assert restored_book.restore(path, symbol='AAA') == 5
+        buy_orders = repository.get_by_field(
+            'order_type', 'buy', 'price', True)
+        assert buy_orders == [
+            valid_orders[3], valid_orders[2], same_price_order]
+        for order in buy_orders:
+            assert order.symbol == 'AAA'
+        restored = repository.get_by_field(
+            'order_id', valid_orders[0].order_id)[0]
+        assert restored.model_dump(exclude={'symbol'}) == (
+            valid_orders[0].model_dump(exclude={'symbol'}))
+
+
+def test_snapshot_forked_books_match_in_the_same_way(tmp_path):
+    path = str(tmp_path / 'book.npy')
+    order_book = models.OrderBook(PriceLevelOrderRepository())
+    batches = stream_random_orders(300, seed=2, batches=2)
+    order_book.batch_add_and_match(next(batches))
+    order_book.snapshot(path)
+    next_orders = next(batches)
+    results = []
+    for _ in range(2):
+        forked_book = models.OrderBook(PriceLevelOrderRepository())
+        forked_book.restore(path)
+        results.append(forked_book.batch_add_and_match(next_orders)[0])
+    assert results[0] == results[1]
+    assert results[0] == order_book.batch_add_and_match(next_orders)[0]
+
+
+def test_snapshot_restores_expiry_of_gtt_orders(valid_orders, tmp_path):
+    path = str(tmp_path / 'book.npy')
+    order_book = models.OrderBook(PriceLevelOrderRepository())
+    expiring_order = valid_orders[1].model_copy(
+        update={'time_in_force': 'GTT', 'expires_at': 150.0})
+    order_book.add(expiring_order)
+    order_book.add(valid_orders[0])
+    order_book.snapshot(path)
+
+    restored_book = models.OrderBook(PriceLevelOrderRepository(),
+                                     clock=lambda: 1000.0)
+    restored_book.restore(path)
+    assert restored_book.orders.get_best('sell').expires_at == 150.0
+    assert restored_book.expire() == [expiring_order]
+    assert len(restored_book.orders) == 1
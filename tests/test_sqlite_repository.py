@@ -0,0 +1,86 @@
+import pytest
+
+from domain.models import OrderBook
+from orderflow.stochastic import StochasticOrderFlow
+from repository.repository import PriceLevelOrderRepository, RepNotFoundError
+from repository.sqlite_repository import SQLiteOrderRepository
+
+
+def test_rep_order_sqlite_rep_restores_committed_orders(valid_orders,
+                                                        tmp_path):
+    path = str(tmp_path / 'book.sqlite')
+    repository = SQLiteOrderRepository(path)
+    for order in valid_orders:
+        repository.add(order)
+    repository.update(valid_orders[2].with_quantity(7))
+    repository.commit()
+    repository.remove(valid_orders[0])
+    repository._db.close()
+
+    repository = SQLiteOrderRepository(path)
+    assert len(repository) == 4
+    assert repository.count('buy') == 2
+    assert repository.get_by_field(
+        field='order_type',
+        value='buy',
+        sort_field='price',
+        reverse_sorting=True,
+    ) == [valid_orders[3], valid_orders[2].with_quantity(7)]
+    assert repository.get_depth('sell') == [(15, 3), (30, 5)]
+    assert repository.get_by_range('price', 15, 30, True) == [
+        valid_orders[0], valid_orders[2].with_quantity(7), valid_orders[1]]
+    repository.close()
+
+
+def test_rep_order_sqlite_rep_apply_no_changes_if_update_not_found(
+        valid_orders):
+    repository = SQLiteOrderRepository()
+    for order in valid_orders[:3]:
+        repository.add(order)
+    with pytest.raises(RepNotFoundError):
+        repository.apply_changes(
+            removed=valid_orders[:2],
+            updated=[valid_orders[3]],
+        )
+    assert len(repository) == 3
+    repository.close()
+
+
+def test_rep_order_sqlite_rep_matches_as_price_level_rep():
+    flow = StochasticOrderFlow(seed=5, cancel_ratio=0.3)
+    batches = list(flow.stream(100, batches=10))
+    books = [OrderBook(PriceLevelOrderRepository()),
+             OrderBook(SQLiteOrderRepository())]
+    results = []
+    for order_book in books:
+        result = []
+        for batch in batches:
+            order_book.batch_remove(batch.cancels)
+            result.append(order_book.batch_add_and_match(batch.orders))
+            order_book.commit()
+        results.append(result)
+    reference, database = (order_book.orders for order_book in books)
+    assert results[0] == results[1]
+    assert len(database) == len(reference)
+    for order_type in ('buy', 'sell'):
+        assert (database.get_depth(order_type, 5)
+                == reference.get_depth(order_type, 5))
+        assert (database.get_by_field('order_type', order_type, 'price')
+                == reference.get_by_field('order_type', order_type, 'price'))
+    database.close()
+
+
+def test_rep_order_sqlite_rep_restores_expiry_of_gtt_orders(valid_orders,
+                                                            tmp_path):
+    path = str(tmp_path / 'book.sqlite')
+    repository = SQLiteOrderRepository(path)
+    OrderBook(repository).add(valid_orders[1].model_copy(
+        update={'time_in_force': 'GTT', 'expires_at': 150.0}))
+    repository.close()
+
+    repository = SQLiteOrderRepository(path)
+    order_book = OrderBook(repository, clock=lambda: 1000.0)
+    assert [order.order_id for order in order_book.expire()] == [
+        valid_orders[1].order_id]
+    assert len(repository) == 0
+    repository.close()
@@ -0,0 +1,86 @@
+from uuid import uuid4
+
+from domain.models import Order, OrderBook
+from orderflow.stochastic import StochasticOrderFlow
+from repository.repository import PriceLevelOrderRepository
+from repository.tiered_repository import TieredOrderRepository
+
+
+def test_rep_order_tiered_rep_spills_and_pages_in_levels(valid_orders,
+                                                         tmp_path):
+    repository = TieredOrderRepository(
+        str(tmp_path / 'spill.sqlite'), max_orders=2, hot_levels=1)
+    for order in valid_orders:
+        repository.add(order)
+    assert len(repository.orders) == 2
+    assert repository.spilled_count() == 2
+    assert len(repository) == 4
+    assert repository.get_depth('sell') == [(15, 3), (30, 5)]
+    assert repository.get_by_field(
+        'order_id', valid_orders[0].order_id) == [valid_orders[0]]
+    assert repository.get_by_field(
+        field='order_type',
+        value='buy',
+        sort_field='price',
+        reverse_sorting=True,
+    ) == [valid_orders[3], valid_orders[2]]
+    repository.update(valid_orders[2].with_quantity(4))
+    assert repository.get_depth('buy') == [(233.4, 6), (17, 4)]
+    repository.remove(valid_orders[3])
+    assert repository.get_best('buy').quantity == 4
+    assert repository.spilled_count('buy') == 0
+    repository.batch_remove([valid_orders[0]])
+    assert len(repository) == 2
+    assert repository.spilled_count() == 0
+    repository.close()
+
+
+def test_rep_order_tiered_rep_matches_as_price_level_rep():
+    flow = StochasticOrderFlow(seed=3, volatility=0.5, cancel_ratio=0.3)
+    batches = list(flow.stream(200, batches=10))
+    books = [OrderBook(PriceLevelOrderRepository()),
+             OrderBook(TieredOrderRepository(max_orders=50, hot_levels=5))]
+    results = []
+    for order_book, budget in zip(books, (None, 50)):
+        result = []
+        for batch in batches:
+            for order in batch.orders:
+                result.append(order_book.add_and_match(order))
+                assert not budget or len(order_book.orders.orders) <= budget
+            order_book.batch_remove(batch.cancels)
+            assert not budget or len(order_book.orders.orders) <= budget
+        results.append(result)
+    reference, tiered = (order_book.orders for order_book in books)
+    assert results[0] == results[1]
+    assert tiered.spilled_count() > 0
+    assert len(tiered.orders) <= 50
+    assert len(tiered) == len(reference)
+    for order_type in ('buy', 'sell'):
+        assert (tiered.get_depth(order_type)
+                == reference.get_depth(order_type))
+        assert (tiered.get_by_field('order_type', order_type, 'price')
+                == reference.get_by_field('order_type', order_type, 'price'))
+    tiered.close()
+
+
+def test_rep_order_tiered_rep_pages_in_only_levels_within_budget():
+    repository = TieredOrderRepository(max_orders=10, hot_levels=3)
+    order_book = OrderBook(repository)
+    for number, price in ((5, 1.0), (5, 1.01), (50, 1.02)):
+        for _ in range(number):
+            order_book.add(Order.trusted(uuid4(), 1, 'sell', 1, price))
+            assert len(repository.orders) <= 10
+    assert repository.spilled_count() == 50
+
+    matched, _ = order_book.add_and_match(
+        Order.trusted(uuid4(), 2, 'buy', 5, 1.0))
+    assert len(matched) == 6
+    assert len(repository.orders) == 5
+    assert repository.spilled_count() == 50
+    assert repository.get_depth('sell') == [(1.01, 5), (1.02, 50)]
+
+    order_book.add_and_match(Order.trusted(uuid4(), 3, 'buy', 45, 1.02))
+    assert len(repository.orders) == 10
+    assert repository.spilled_count() == 0
+    assert repository.get_depth('sell') == [(1.02, 10)]
+    repository.close()
@@ -0,0 +1,65 @@
+import random
+from uuid import UUID
+
+from domain import models
+from domain.vectorized import VectorizedOrderBook
+from repository.repository import PriceLevelOrderRepository
+
+
+def random_orders(seed, number):
+    generator = random.Random(seed)
+    return [
+        models.Order(
+            order_id=UUID(int=generator.getrandbits(128)),
+            timestamp=1,
+            order_type=generator.choice(('sell', 'buy')),
+            quantity=generator.randint(1, 50),
+            price=generator.randint(90, 110),
+        )
+        for _ in range(number)
+    ]
+
+
+def test_vectorized_order_book_matches_orders_correctly(orders_to_match):
+    repository = PriceLevelOrderRepository()
+    order_book = VectorizedOrderBook(repository)
+    for order in orders_to_match['orders']:
+        order_book.add(order)
+
+    match, partial = order_book.match()
+
+    assert sorted(match) == sorted(orders_to_match['exp_match'])
+    assert sorted(partial) == sorted(orders_to_match['exp_partial'])
+    assert [order.quantity for order in partial] == [3]
+    unmatched = sorted(models.as_order(item)
+                       for item in repository.orders.values())
+    assert unmatched == sorted(orders_to_match['exp_unmatched'])
+    assert [order.quantity for order in unmatched] == [2, 1]
+
+
+def test_vectorized_order_book_matches_as_order_book():
+    for seed in range(20):
+        orders = random_orders(seed, 200)
+        results = []
+        for book_class in (models.OrderBook, VectorizedOrderBook):
+            repository = PriceLevelOrderRepository()
+            order_book = book_class(repository)
+            for order in orders:
+                order_book.add(order)
+            match, partial = order_book.match()
+            results.append((
+                sorted(match),
+                sorted((order.order_id, order.quantity) for order in partial),
+                sorted((item.order_id, item.quantity)
+                       for item in repository.orders.values()),
+            ))
+        assert results[0] == results[1], f'seed {seed}'
+
+
+def test_vectorized_order_book_does_not_match_uncrossed_book(valid_orders):
+    order_book = VectorizedOrderBook(PriceLevelOrderRepository())
+    for order in valid_orders[:3]:
+        order_book.add(order)
+    order_book.remove(valid_orders[1])
+    assert order_book.match() == ([], [])
+    assert len(order_book.orders) == 2